@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+#Converts all gEDA PCB, gschem and LTspice files of directory tree to kicad using process pool
+
+import argparse, json, os, sys, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cache
+
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(myDir, "parsers"))
+
+#input extension -> output extension
+EXTENSIONS = {
+    '.pcb': '.kicad_pcb',
+    '.sch': '.sch',
+    '.asc': '.sch',
+}
+
+#options are defaults of single file converters, keys are built by cache.conversionKey as there, so cache entries are shared
+
+def convertPcb(infile, outfile, c):
+    import pcb2kicad
+    options = {'merge': False, 'nets': False}
+    key = cache.conversionKey(c, infile, pcb2kicad, **options)
+    return cache.convert(c, key, outfile, lambda: pcb2kicad.convert(infile, outfile, **options))
+
+def convertGschem(infile, outfile, c):
+    import gschem2kicad as g
+    key = cache.conversionKey(c, infile, g)
+    return cache.convert(c, key, outfile, lambda: g.convert(infile, outfile))
+
+def convertLtspice(infile, outfile, c):
+    import ltspice2kicad as l
+    options = {'tolerance': l.SNAP}
+    key = cache.conversionKey(c, infile, l, **options)
+    return cache.convert(c, key, outfile, lambda: l.convert(infile, outfile, **options))
+
+CONVERTERS = {
+    '.pcb': convertPcb,
+    '.sch': convertGschem,
+    '.asc': convertLtspice,
+}
+
+#input extension -> format and first bytes of its files, kicad schematics share .sch extension with gschem
+HEADERS = {
+    '.pcb': ('gEDA PCB', (b'#', b'FileVersion', b'PCB')),
+    '.sch': ('gschem', (b'v ',)),
+    '.asc': ('LTspice', (b'Version',)),
+}
+
+def hasHeader(path, ext):
+    with open(path, 'rb') as f:
+        return f.read(64).lstrip().startswith(HEADERS[ext][1])
+
+def convertFile(job):
+    """ runs in worker process, returns summary of one conversion """
+    infile, outfile, cacheDir, cacheSize = job
+    start = time.perf_counter()
+    result = {'input': infile, 'output': outfile, 'ok': True, 'error': None, 'cached': False}
+    try:
+        os.makedirs(os.path.dirname(outfile) or '.', exist_ok = True)
+        c = cache.ConversionCache(cacheDir, cacheSize, evictOnStore = False) if cacheDir else None
+        result['cached'] = CONVERTERS[os.path.splitext(infile)[1]](infile, outfile, c)
+    except Exception:
+        result['ok'] = False
+        result['error'] = traceback.format_exc(limit = -1).strip()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def findJobs(indir, outdir):
+    """ (infile, outfile) pairs for all files of known format in indir, outdir is not searched
+    files whose output would overwrite an input or output of other file are skipped """
+    inputs = []
+    skip = os.path.realpath(outdir)
+    for root, dirs, files in os.walk(indir):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != skip)
+        for name in sorted(files):
+            base, ext = os.path.splitext(name)
+            path = os.path.join(root, name)
+            if ext not in EXTENSIONS:
+                continue
+            if not hasHeader(path, ext):
+                print('skipped %s: not a %s file' % (path, HEADERS[ext][0]))
+                continue
+            rel = os.path.relpath(os.path.join(root, base + EXTENSIONS[ext]), indir)
+            inputs.append((path, os.path.join(outdir, rel)))
+    jobs = []
+    used = {os.path.realpath(infile) for infile, outfile in inputs}
+    for infile, outfile in inputs:
+        real = os.path.realpath(outfile)
+        if real in used:
+            print('skipped %s: %s is input or output of other file' % (infile, outfile))
+            continue
+        used.add(real)
+        jobs.append((infile, outfile))
+    return jobs
+
+def main(argv):
+    parser = argparse.ArgumentParser(description = 'Converts .pcb, gschem .sch and LTspice .asc files found in indir to kicad files in outdir.')
+    parser.add_argument('indir')
+    parser.add_argument('outdir')
+    parser.add_argument('-j', '--jobs', type = int, default = os.cpu_count(), help = 'number of worker processes (default: all cores)')
+    parser.add_argument('--summary', help = 'write per file results as json to this file')
+    cache.addArguments(parser)
+    args = parser.parse_args(argv[1:])
+    if os.path.realpath(args.indir) == os.path.realpath(args.outdir):
+        parser.error('outdir must differ from indir, outputs would overwrite inputs')
+
+    jobs = [(infile, outfile, args.cache, args.cache_size << 20) for infile, outfile in findJobs(args.indir, args.outdir)]
+    results = []
+    with ProcessPoolExecutor(max_workers = args.jobs) as pool:
+        futures = [pool.submit(convertFile, job) for job in jobs]
+        for f in as_completed(futures):
+            r = f.result()
+            results.append(r)
+            if r['ok']:
+                print('%s %s -> %s (%.2f s)' % ('cached' if r['cached'] else 'ok    ', r['input'], r['output'], r['seconds']))
+            else:
+                print('FAILED %s: %s' % (r['input'], r['error'].splitlines()[-1]))
+
+    failed = [r for r in results if not r['ok']]
+    print('%d files converted, %d failed' % (len(results) - len(failed), len(failed)))
+    if args.cache:
+        cache.ConversionCache(args.cache, args.cache_size << 20).evict()   #once for all stored outputs
+        hits = sum(1 for r in results if r['cached'])
+        print('cache hits %d, misses %d' % (hits, len(results) - len(failed) - hits))
+    if args.summary:
+        results.sort(key = lambda r: r['input'])
+        with open(args.summary, 'w') as f:
+            json.dump(results, f, indent = 1)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+#Compares scalar and numpy geometry kernels of pcb2kicad on synthetic board with 100k traces
+
+import contextlib, os, sys, time
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import parsepcb, synthpcb
+from pcb import Pcb
+from pcb2kicad import pcb2kicad
+
+def best(f, repeat):
+    t = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        r = f()
+        d = time.perf_counter() - start
+        t = d if t is None else min(t, d)
+    return t, r
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    items = parsepcb.scanItems(synthpcb.generate(elements = 2000, pins = 16, lines = lines // len(synthpcb.LAYERS), polygons = 4))[0]
+    print('%d traces' % lines)
+    for columnar in [False, True]:
+        board = Pcb(items, columnar)
+        results = {}
+        for vectorized in [False, True, None]:
+            with contextlib.redirect_stdout(sys.stderr):
+                t, k = best(lambda: pcb2kicad(board, vectorized = vectorized), repeat)
+            results[vectorized] = t
+            out = ''.join(k.chunks())
+            if vectorized is False:
+                scalar = out
+            elif out != scalar:
+                raise Exception('vectorized output differs')
+        print('%-8s model: scalar %.3f s, vectorized %.3f s (%.2fx), default %.3f s (%.2fx)' % ('columnar' if columnar else 'object',
+            results[False], results[True], results[False] / results[True], results[None], results[False] / results[None]))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#Compares eeschema.loadFields with the former split and reassemble tokenizer
+
+import time, sys, os
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(myDir), "parsers"))
+
+import eeschema
+
+def splitFields(s):
+    """ tokenizer used before eeschema.FIELD """
+    fields = s.split(' ')
+    r = []
+    while fields:
+        f = fields.pop(0)
+        if f:
+            if f[0] == '"':
+                f = f[1:]
+                if f and f[-1] == '"':
+                    f = f[0:-1]
+                else:
+                    p = fields.pop(0)
+                    while p == "" or p[-1] != '"':
+                        f += ' ' + p
+                        p = fields.pop(0)
+                    f += ' ' + p[0:-1]
+            r.append(f)
+    return r
+
+def corpus(n):
+    """ lines of n components and wires as written by eeschema """
+    lines = []
+    for i in range(n):
+        lines += ['$Comp',
+            'L Device:R R%d' % i,
+            'U 1 1 5C9A%04X' % (i % 65536),
+            'P %d %d' % (1000 + i, 2000),
+            'F 0 "R%d" V %d %d 50  0000 C CNN' % (i, 1080 + i, 2000),
+            'F 1 "10k 1%%" V %d %d 50  0000 C CNN' % (1000 + i, 2000),
+            'F 2 "Resistor_SMD:R_0603_1608Metric" V %d %d 50  0001 C CNN' % (930 + i, 2000),
+            'F 3 "" H %d %d 50  0001 C CNN' % (1000 + i, 2000),
+            'F 4 "RC0603FR-0710KL" H %d %d 50  0001 C CNN "mpn"' % (1000 + i, 2000),
+            '\t1    %d %d' % (1000 + i, 2000),
+            '\t1    0    0    -1',
+            '$EndComp',
+            'Wire Wire Line',
+            '\t%d %d %d %d' % (1000 + i, 2150, 1000 + i, 2400),
+            'Text Label %d 2400 0    50   ~ 0' % (1000 + i)]
+    return lines
+
+def measure(tokenize, lines, repeat):
+    best = None
+    for i in range(repeat):
+        t = time.perf_counter()
+        for l in lines:
+            tokenize(l)
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 20000
+    lines = corpus(n)
+    for l in lines:
+        fields = eeschema.loadFields(l)
+        if fields != splitFields(l):
+            raise Exception('tokenizers differ on ' + l)
+        if eeschema.loadFields(eeschema.saveFields(*fields)) != fields:
+            raise Exception('round trip differs on ' + l)
+    old = measure(splitFields, lines, 5)
+    new = measure(eeschema.loadFields, lines, 5)
+    print('%d lines: former %.3f s, loadFields %.3f s (%.2fx)' % (len(lines), old, new, old / new))
+
+if __name__ == "__main__":
+    main(sys.argv)
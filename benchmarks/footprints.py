@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+#Compares conversion time and memory of kicad model with and without sharing of footprint geometry on board of identical elements
+
+import contextlib, os, sys, time, tracemalloc
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import parsepcb, synthpcb
+from pcb import Pcb
+from pcb2kicad import pcb2kicad
+
+def best(f, repeat):
+    t = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        r = f()
+        d = time.perf_counter() - start
+        t = d if t is None else min(t, d)
+    return t, r
+
+def size(f):
+    """ bytes allocated by f and still held by its result """
+    tracemalloc.start()
+    r = f()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, r
+
+if __name__ == "__main__":
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    board = Pcb(parsepcb.scanItems(synthpcb.generate(elements = elements, pins = 16, lines = 100, polygons = 0))[0])
+    print('%d elements' % elements)
+    outputs = []
+    for shared in [False, True]:
+        with contextlib.redirect_stdout(sys.stderr):
+            t, k = best(lambda: pcb2kicad(board, shared = shared), repeat)
+            m, k = size(lambda: pcb2kicad(board, shared = shared))
+        outputs.append(''.join(k.chunks()))
+        print('%-9s %.3f s, model %.1f MB' % ('shared' if shared else 'unshared', t, m / 1e6))
+    if outputs[0] != outputs[1]:
+        raise Exception('shared output differs')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#Times building of S tree and serialization of kicad model with many segments
+#compiled fieldsToS and pausing of garbage collector are measured separately against generic fieldsToS of field tables
+
+import gc, os, sys, time
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import kicad
+from kicad import Kicad, Segment, Loadable
+from parsekicad import S
+
+def board(n):
+    k = Kicad()
+    k.version = '20171130'
+    k.host = ['pcbnew', '5.0.0']
+    for i in range(n):
+        s = Segment()   #net and tstamp are left blank as in pcb2kicad
+        s.start = (i * 1000, 2000)
+        s.end = (i * 1000 + 5000, 2000)
+        s.width = 254000
+        s.layer = 'F.Cu'
+        k.segments.append(s)
+    return k
+
+def genericFieldsToS(self):
+    """ fieldsToS reading fields table on each call, missing fields are skipped by AttributeError """
+    r = []
+    for name, field in self.fields.items():
+        try:
+            s = field.toS(self, name)
+            if isinstance(s, S):
+                r.append(s)
+            else:
+                r += s
+        except AttributeError:
+            pass
+    return r
+
+def loadables(cls = Loadable):
+    for c in cls.__subclasses__():
+        yield c
+        yield from loadables(c)
+
+def generic(on):
+    """ switches all Loadable classes to generic fieldsToS or back to compiled one """
+    for c in loadables():
+        if on:
+            c.compiled = c.fieldsToS
+            c.fieldsToS = genericFieldsToS
+        else:
+            c.fieldsToS = c.compiled
+
+def toS(k, collect):
+    """ same as Kicad.toS, with collector running or paused """
+    enabled = gc.isenabled()
+    if not collect:
+        gc.disable()
+    try:
+        return S('kicad_pcb', k.fieldsToS())
+    finally:
+        if enabled:
+            gc.enable()
+
+def best(f, repeat):
+    t = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        f()
+        d = time.perf_counter() - start
+        t = d if t is None else min(t, d)
+    return t
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    k = board(n)
+    print('%d segments, toS' % n)
+    for compiled in [False, True]:
+        generic(not compiled)
+        for collect in [True, False]:
+            t = best(lambda: toS(k, collect), repeat)
+            print('%-8s fieldsToS, gc %-6s %.3f s' % ('compiled' if compiled else 'generic', 'on' if collect else 'paused', t))
+        if not compiled:
+            generic(False)
+    save = best(lambda: sum(len(c) for c in k.chunks()), repeat)
+    print('Kicad.toS and serialization %.3f s' % save)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+#Compares memory of pcb model objects with __slots__ against same classes with __dict__
+
+import os, sys, tracemalloc
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import parsepcb, pcb
+
+CLASSES = [
+    (pcb.Line, (), 'Line[1000.00mil 1000.00mil 1100.00mil 1000.00mil 10.00mil 20.00mil "clearline"]'),
+    (pcb.Arc, (), 'Arc[1000.00mil 1000.00mil 50.00mil 50.00mil 10.00mil 20.00mil 0 90 "clearline"]'),
+    (pcb.Via, (), 'Via[1000.00mil 1000.00mil 36.00mil 20.00mil 0.0000 20.00mil "" ""]'),
+    (pcb.Pin, (), 'Pin[0.0000 0.0000 60.00mil 30.00mil 66.00mil 28.00mil "1" "1" "square"]'),
+    (pcb.Pad, (), 'Pad[0.0000 -20.00mil 0.0000 20.00mil 0.6000mm 20.00mil 0.7000mm "1" "1" "square"]'),
+    (pcb.ElementArc, (), 'ElementArc [-50.00mil 0.0000 10.00mil 10.00mil 0 360 10.00mil]'),
+    (pcb.SymbolLine, (True,), 'ElementLine [-50.00mil -50.00mil 400.00mil -50.00mil 10.00mil]'),
+]
+
+def withDict(cls):
+    """ same class without __slots__ """
+    return type(cls.__name__ + 'Dict', (), {'__init__': cls.__init__, 'itemize': cls.itemize})
+
+def perObject(cls, item, args, n):
+    """ bytes allocated per object including its attribute values """
+    objs = [cls(item, *args)]
+    tracemalloc.start()
+    objs.extend(cls(item, *args) for i in range(n))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / n
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('%-12s %10s %10s %8s' % ('class', 'dict B', 'slots B', 'saved'))
+    for cls, args, text in CLASSES:
+        item = parsepcb.scanItems(text)[0][0]
+        name = text.split('[')[0].strip()
+        slots = perObject(cls, item, args, n)
+        dicts = perObject(withDict(cls), item, args, n)
+        print('%-12s %10.1f %10.1f %7.0f%%' % (name, dicts, slots, 100 * (1 - slots / dicts)))
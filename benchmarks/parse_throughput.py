@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+#Compares throughput of recursive parsepcb.parseItems and single pass parsepcb.scanItems
+
+import time, sys, os
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import parsepcb, synthpcb
+
+def measure(parse, s, repeat):
+    best = None
+    for i in range(repeat):
+        t = time.perf_counter()
+        parse(s)
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return len(s.encode()) / 1e6 / best
+
+def main(argv):
+    repeat = 3
+    inputs = [(path, open(path).read()) for path in argv[1:]]
+    if not inputs:
+        inputs = [('synthetic', synthpcb.generate(elements = 2000, pins = 16, lines = 20000, polygons = 20))]
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    for name, s in inputs:
+        old = measure(lambda s: parsepcb.parseItems(s, 0), s, repeat)
+        new = measure(parsepcb.scanItems, s, repeat)
+        print('%s: %.1f MB, parseItems %.2f MB/s, scanItems %.2f MB/s (%.2fx)' % (name, len(s.encode()) / 1e6, old, new, new / old))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+#Times parse, model, convert and save phases of pcb2kicad on synthetic boards, results are written as json
+
+import argparse, contextlib, json, os, platform, sys, tempfile, time, tracemalloc
+myDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(myDir))
+
+import parsepcb, synthpcb
+from pcb import Pcb
+from pcb2kicad import pcb2kicad, VERSION
+
+SCALES = {
+    'small': dict(elements = 100, pins = 8, lines = 1000, polygons = 4, holes = 1),
+    'medium': dict(elements = 1000, pins = 16, lines = 20000, polygons = 20, holes = 2),
+    'large': dict(elements = 5000, pins = 32, lines = 100000, polygons = 100, holes = 4),
+}
+
+def phases(path, out, columnar = False):
+    """ (name, function) of each phase, function gets result of previous phase """
+    return [
+        ('parse', lambda prev: parsepcb.load(path)),
+        ('model', lambda prev: Pcb(prev, columnar)),
+        ('convert', lambda prev: pcb2kicad(prev)),
+        ('save', lambda prev: prev.save(out)),
+    ]
+
+def timePhases(path, out, repeat, columnar):
+    """ best wall time of each phase """
+    best = {}
+    for i in range(repeat):
+        prev = None
+        for name, run in phases(path, out, columnar):
+            t = time.perf_counter()
+            prev = run(prev)
+            t = time.perf_counter() - t
+            best[name] = min(best.get(name, t), t)
+    return best
+
+def memoryPhases(path, out, columnar):
+    """ peak of memory allocated during each phase, measured in separate run as tracing is slow """
+    peaks = {}
+    prev = None
+    for name, run in phases(path, out, columnar):
+        tracemalloc.start()
+        prev = run(prev)
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peaks
+
+def counts(path):
+    pcb = Pcb(path)
+    return {
+        'elements': len(pcb.elements),
+        'pins': sum(len(e.pins) + len(e.pads) for e in pcb.elements),
+        'lines': sum(len(l.lines) for l in pcb.layers),
+        'polygons': sum(len(l.polygons) for l in pcb.layers),
+        'vias': len(pcb.vias),
+        'nets': len(pcb.netlist.nets),
+    }
+
+def run(params, repeat, tmp, columnar = False):
+    path = os.path.join(tmp, 'board.pcb')
+    out = os.path.join(tmp, 'board.kicad_pcb')
+    synthpcb.write(path, **params)
+    size = os.path.getsize(path)
+    times = timePhases(path, out, repeat, columnar)
+    peaks = memoryPhases(path, out, columnar)
+    objects = counts(path)
+    total = sum(objects.values())
+    result = {'params': params, 'input_bytes': size, 'output_bytes': os.path.getsize(out), 'objects': objects, 'phases': {}}
+    for name, seconds in times.items():
+        result['phases'][name] = {
+            'seconds': seconds,
+            'objects_per_s': total / seconds,
+            'peak_bytes': peaks[name],
+        }
+    result['phases']['parse']['mb_per_s'] = size / 1e6 / times['parse']
+    result['phases']['save']['mb_per_s'] = result['output_bytes'] / 1e6 / times['save']
+    return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description = 'Benchmarks pcb2kicad phases on synthetic boards.')
+    parser.add_argument('--scale', choices = sorted(SCALES), action = 'append', help = 'board sizes to run (default: small and medium)')
+    for name in ['elements', 'pins', 'lines', 'polygons', 'holes']:
+        parser.add_argument('--' + name, type = int, help = 'overrides %s of every scale' % name)
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--columnar', action = 'store_true', help = 'store lines and vias of model in numpy arrays')
+    parser.add_argument('--json', help = 'write results to this file instead of stdout')
+    args = parser.parse_args(argv[1:])
+
+    report = {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'columnar': args.columnar,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale or ['small', 'medium']:
+            params = dict(SCALES[scale])
+            for name in params:
+                if getattr(args, name) is not None:
+                    params[name] = getattr(args, name)
+            with contextlib.redirect_stdout(sys.stderr):    #keeps converter messages out of json
+                report['results'][scale] = run(params, args.repeat, tmp, args.columnar)
+            times = report['results'][scale]['phases']
+            print('%s: %s' % (scale, ', '.join('%s %.3f s' % (n, p['seconds']) for n, p in times.items())), file = sys.stderr)
+    text = json.dumps(report, indent = 1)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main(sys.argv)
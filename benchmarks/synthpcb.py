@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#Generates synthetic gEDA PCB boards of configurable size for benchmarks
+
+import random, sys
+
+HEADER = '''# release: pcb 4.0.2
+FileVersion[20091103]
+
+PCB["" 6000.00mil 5000.00mil]
+
+Grid[10.00mil 0.0000 0.0000 1]
+PolyArea[3100.006200]
+Thermal[0.500000]
+DRC[10.00mil 10.00mil 10.00mil 7.00mil 15.00mil 10.00mil]
+Flags("nameonpcb,clearnew,snappin")
+Groups("1,c:2,s:3:4")
+Styles["Signal,10.00mil,36.00mil,20.00mil,10.00mil:Power,25.00mil,60.00mil,35.00mil,10.00mil"]
+
+Symbol[' ' 18.00mil]
+(
+)
+Symbol['1' 12.00mil]
+(
+	SymbolLine[5.00mil 45.00mil 25.00mil 45.00mil 8.00mil]
+	SymbolLine[15.00mil 5.00mil 15.00mil 45.00mil 8.00mil]
+)
+Attribute("PCB::grid::unit" "mil")
+'''
+
+LAYERS = [('top', 'copper'), ('bottom', 'copper'), ('outline', 'outline'), ('top silk', 'silk')]
+
+def generate(elements = 100, pins = 8, lines = 1000, polygons = 4, holes = 1, nets = None, vias = None, seed = 1):
+    """ board with elements of pins pads/pins each, lines per layer, polygons with holes on copper layers
+    nets connect random pins of elements, default is one net per two elements """
+    r = random.Random(seed)
+    if nets is None:
+        nets = max(1, elements // 2)
+    if vias is None:
+        vias = lines // 10
+    out = [HEADER]
+    w = out.append
+    for i in range(vias):
+        w('Via[%d.00mil %d.00mil 36.00mil 20.00mil 0.0000 20.00mil "" ""]\n' % (r.randrange(100, 5900), r.randrange(100, 4900)))
+    for e in range(elements):
+        x = 100 + (e * 600) % 5600
+        y = 100 + (e * 600) // 5600 * 300 % 4600
+        w('\nElement["%s" "SO%d" "U%d" "%d" %d.00mil %d.00mil -10.00mil -60.00mil 0 100 ""]\n(\n' % ('onsolder' if e % 7 == 0 else '', pins, e, e, x, y))
+        w('\tAttribute("device" "IC")\n')
+        for p in range(pins):
+            if e % 3 == 0:
+                w('\tPin[%d.00mil 0.0000 60.00mil 30.00mil 66.00mil 28.00mil "%d" "%d" "%s"]\n' % (p * 50, p + 1, p + 1, 'square' if p == 0 else ''))
+            else:
+                w('\tPad[%d.00mil -20.00mil %d.00mil 20.00mil 0.6000mm 20.00mil 0.7000mm "%d" "%d" "%s"]\n' % (p * 50, p * 50, p + 1, p + 1, 'square' if p == 0 else 'square,nopaste'))
+        w('\tElementLine [-50.00mil -50.00mil %d.00mil -50.00mil 10.00mil]\n' % (pins * 50))
+        w('\tElementLine [-50.00mil 50.00mil %d.00mil 50.00mil 10.00mil]\n' % (pins * 50))
+        w('\tElementArc [-50.00mil 0.0000 10.00mil 10.00mil 0 360 10.00mil]\n')
+        w('\n\t)\n')
+    for n, (name, flags) in enumerate(LAYERS):
+        w('Layer(%d "%s" "%s")\n(\n' % (n + 1, name, flags))
+        x, y = r.randrange(100, 5900), r.randrange(100, 4900)
+        for l in range(lines):
+            if l % 50 == 49:    #new trace
+                x, y = r.randrange(100, 5900), r.randrange(100, 4900)
+            nx, ny = (x + 10, y) if l % 5 else (x, y + 10)
+            w('\tLine[%d.00mil %d.00mil %d.00mil %d.00mil 10.00mil 20.00mil "clearline"]\n' % (x, y, nx, ny))
+            x, y = nx, ny
+        if flags == 'copper':
+            w('\tArc[1000.00mil 1000.00mil 50.00mil 50.00mil 10.00mil 20.00mil 0 90 "clearline"]\n')
+            w('\tText[100.00mil 100.00mil 0 100 "synthetic board" "clearline"]\n')
+            for p in range(polygons):
+                x, y = r.randrange(100, 5000), r.randrange(100, 4000)
+                w('\tPolygon("clearpoly")\n\t(\n\t\t[%d.00mil %d.00mil] [%d.00mil %d.00mil] [%d.00mil %d.00mil] [%d.00mil %d.00mil]\n' % (x, y, x + 800, y, x + 800, y + 800, x, y + 800))
+                for h in range(holes):
+                    hx, hy = x + 100 + h * 150 % 600, y + 100 + h * 150 // 600 * 150 % 600
+                    w('\t\tHole (\n\t\t\t[%d.00mil %d.00mil] [%d.00mil %d.00mil] [%d.00mil %d.00mil]\n\t\t)\n' % (hx, hy, hx + 100, hy, hx + 50, hy + 100))
+                w('\t)\n')
+        w(')\n')
+    w('NetList()\n(\n')
+    for n in range(nets if elements else 0):
+        w('\tNet("N%d" "(unknown)")\n\t(\n' % n)
+        for c in range(3):
+            w('\t\tConnect("U%d-%d")\n' % (r.randrange(elements), r.randrange(1, pins + 1)))
+        w('\t)\n')
+    w(')\n')
+    return ''.join(out)
+
+def write(path, **params):
+    with open(path, 'w') as f:
+        f.write(generate(**params))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('usage:\n%s out.pcb [elements [pins [lines [polygons [holes]]]]]' % sys.argv[0])
+        sys.exit(1)
+    names = ['elements', 'pins', 'lines', 'polygons', 'holes']
+    write(sys.argv[1], **dict(zip(names, [int(a) for a in sys.argv[2:]])))
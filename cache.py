@@ -0,0 +1,102 @@
+#On disk cache of converted files keyed by hash of input, converter and its tables
+
+import hashlib, os, shutil
+
+def version(*modules):
+    """ hash of source of given modules, changes whenever converter changes """
+    h = hashlib.sha256()
+    for m in modules:
+        with open(m.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+class ConversionCache:
+    """ files are stored under their key, modification time is time of last use
+    least recently used files are removed when total size exceeds maxSize
+    with evictOnStore False eviction is left to caller, e.g. once after batch of conversions """
+    def __init__(self, path, maxSize = 1 << 30, evictOnStore = True):
+        self.path = path
+        self.maxSize = maxSize
+        self.evictOnStore = evictOnStore
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok = True)
+
+    def key(self, infile, version, *tables):
+        h = hashlib.sha256()
+        h.update(version.encode())
+        for t in tables:
+            h.update(repr(t).encode())
+        with open(infile, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def fetch(self, key, outfile):
+        """ writes cached output to outfile, returns False if it is not cached """
+        entry = os.path.join(self.path, key)
+        try:
+            os.utime(entry)
+            shutil.copyfile(entry, outfile)
+        except FileNotFoundError:   #not cached or evicted by other process meanwhile
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, key, outfile):
+        entry = os.path.join(self.path, key)
+        tmp = '%s.%d.tmp' % (entry, os.getpid())
+        shutil.copyfile(outfile, tmp)
+        os.replace(tmp, entry)  #other processes see whole file or nothing
+        if self.evictOnStore:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for e in os.scandir(self.path):
+            if e.is_file() and not e.name.endswith('.tmp'):
+                try:
+                    st = e.stat()
+                except FileNotFoundError:   #removed by other process
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:   #removed by other process
+                pass
+            total -= size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+def conversionKey(c, infile, converter, **options):
+    """ key of conversion of infile by converter module with options of its convert function, None without cache
+    single file converters and batch2kicad build keys only here, so they share entries """
+    if c is None:
+        return None
+    return c.key(infile, converter.VERSION, *getattr(converter, 'TABLES', ()), sorted(options.items()))
+
+def convert(cache, key, outfile, conversion):
+    """ runs conversion unless output for key is cached, returns True on cache hit """
+    if cache is not None and cache.fetch(key, outfile):
+        return True
+    conversion()
+    if cache is not None:
+        cache.store(key, outfile)
+    return False
+
+def addArguments(parser):
+    parser.add_argument('--cache', metavar = 'DIR', help = 'reuse outputs of unchanged inputs stored in DIR')
+    parser.add_argument('--cache-size', type = int, default = 1024, metavar = 'MB', help = 'maximum size of cache (default: 1024 MB)')
+
+def fromArguments(args):
+    if not args.cache:
+        return None
+    return ConversionCache(args.cache, args.cache_size << 20)
@@ -0,0 +1,338 @@
+#Finds copper connectivity of kicad board and assigns nets of pads to segments and vias
+#polygons are not part of copper graph, gEDA pours clear around copper which does not connect to them by thermal
+
+from math import hypot
+from kicad import Pad, Segment
+from stats import NOSTATS
+
+class UnionFind:
+    """ disjoint sets of integers 0..n-1 """
+    def __init__(self, n):
+        self.parent = list(range(n))
+    def find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:    #path compression
+            parent[i], i = root, parent[i]
+        return root
+    def union(self, i, j):
+        i = self.find(i)
+        j = self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+        return i != j
+
+class Grid:
+    """ uniform grid hashing indices of objects by cells covered by their bounding boxes """
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = {}
+    def keys(self, bbox):
+        c = self.cell
+        x1, y1, x2, y2 = bbox
+        return [(x, y) for x in range(int(x1 // c), int(x2 // c) + 1) for y in range(int(y1 // c), int(y2 // c) + 1)]
+    def add(self, i, bbox):
+        cells = self.cells
+        for k in self.keys(bbox):
+            cells.setdefault(k, []).append(i)
+    def near(self, bbox):
+        """ indices of objects whose cells overlap bbox """
+        r = set()
+        cells = self.cells
+        for k in self.keys(bbox):
+            if k in cells:
+                r.update(cells[k])
+        return r
+
+#shapes are ('c', x1, y1, x2, y2, r) capsule (segment with width, circle when ends are same),
+#('r', x1, y1, x2, y2) axis aligned rectangle and ('p', points) polygon, which only has bbox
+
+def bbox(shape):
+    if shape[0] == 'c':
+        k, x1, y1, x2, y2, r = shape
+        return (min(x1, x2) - r, min(y1, y2) - r, max(x1, x2) + r, max(y1, y2) + r)
+    if shape[0] == 'r':
+        return shape[1:]
+    xs = [p[0] for p in shape[1]]
+    ys = [p[1] for p in shape[1]]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def pointSegment(px, py, x1, y1, x2, y2):
+    """ distance of point from segment """
+    dx, dy = x2 - x1, y2 - y1
+    l = dx * dx + dy * dy
+    t = 0 if l == 0 else max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / l))
+    return hypot(px - x1 - t * dx, py - y1 - t * dy)
+
+def orientation(ax, ay, bx, by, cx, cy):
+    v = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (v > 0) - (v < 0)
+
+def crosses(a, b):
+    """ segments a and b given as (x1, y1, x2, y2) properly intersect """
+    o1 = orientation(*a, b[0], b[1])
+    o2 = orientation(*a, b[2], b[3])
+    o3 = orientation(*b, a[0], a[1])
+    o4 = orientation(*b, a[2], a[3])
+    return o1 * o2 < 0 and o3 * o4 < 0
+
+def segmentSegment(a, b):
+    if crosses(a, b):
+        return 0
+    return min(pointSegment(a[0], a[1], *b), pointSegment(a[2], a[3], *b), pointSegment(b[0], b[1], *a), pointSegment(b[2], b[3], *a))
+
+def pointRect(px, py, r):
+    x1, y1, x2, y2 = r
+    return hypot(max(x1 - px, 0, px - x2), max(y1 - py, 0, py - y2))
+
+def segmentRect(s, r):
+    x1, y1, x2, y2 = r
+    edges = [(x1, y1, x2, y1), (x2, y1, x2, y2), (x2, y2, x1, y2), (x1, y2, x1, y1)]
+    return min([pointRect(s[0], s[1], r), pointRect(s[2], s[3], r)] + [segmentSegment(s, e) for e in edges])
+
+def inside(px, py, points):
+    """ point is inside polygon, by crossing number """
+    r = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        xi, yi = points[i]
+        xj, yj = points[j]
+        if (yi > py) != (yj > py) and px < xi + (py - yi) * (xj - xi) / (yj - yi):
+            r = not r
+        j = i
+    return r
+
+def touch(a, b):
+    """ copper shapes a and b, capsules or rectangles, are connected """
+    if a[0] == 'r' and b[0] == 'c':
+        a, b = b, a
+    if a[0] == 'c':
+        if b[0] == 'c':
+            return segmentSegment(a[1:5], b[1:5]) <= a[5] + b[5]
+        return segmentRect(a[1:5], b[1:]) <= a[5]
+    return a[1] <= b[3] and b[1] <= a[3] and a[2] <= b[4] and b[2] <= a[4]
+
+def padShape(m, p):
+    """ shape of pad p of module m, modules are not rotated """
+    x, y = m.at[0] + p.at[0], m.at[1] + p.at[1]
+    w, h = p.size
+    if p.shape == 'rect':
+        return ('r', x - w / 2, y - h / 2, x + w / 2, y + h / 2)
+    if w > h:
+        return ('c', x - (w - h) / 2, y, x + (w - h) / 2, y, h / 2)
+    return ('c', x, y - (h - w) / 2, x, y + (h - w) / 2, w / 2)
+
+def copperLayers(layers, allLayers):
+    if '*.Cu' in layers:
+        return allLayers
+    return [l for l in layers if l.endswith('.Cu')]
+
+def boardLayers(kicad):
+    """ all copper layers used on board """
+    return sorted({s.layer for s in kicad.segments} | {z.layer for z in kicad.zones if z.layer.endswith('.Cu')} | {'F.Cu', 'B.Cu'})
+
+def copper(kicad):
+    """ (kicad object, shape, copper layers) of pads, vias and segments
+    zones are left out, pour does not connect to copper it clears, see zoneNets """
+    allLayers = boardLayers(kicad)
+    objects = []
+    for m in kicad.modules:
+        for p in m.pads:
+            if p.t != 'np_thru_hole':
+                objects.append((p, padShape(m, p), copperLayers(p.layers, allLayers)))
+    for v in kicad.vias:
+        objects.append((v, ('c', v.at[0], v.at[1], v.at[0], v.at[1], v.size / 2), allLayers))    #burried vias are not exported
+    for s in kicad.segments:
+        objects.append((s, ('c', s.start[0], s.start[1], s.end[0], s.end[1], s.width / 2), [s.layer]))
+    return objects
+
+def cellSize(boxes):
+    """ twice median size of objects, so most objects fall into few cells """
+    sizes = sorted(max(b[2] - b[0], b[3] - b[1]) for b in boxes)
+    return max(2 * sizes[len(sizes) // 2], 1000) if sizes else 1000
+
+def connect(objects, cell = None):
+    """ UnionFind of indices of touching objects, each object is compared only with objects in same grid cells """
+    boxes = [bbox(shape) for o, shape, layers in objects]
+    if cell is None:
+        cell = cellSize(boxes)
+    sets = UnionFind(len(objects))
+    grids = {}  #layer -> Grid
+    for i, (o, shape, layers) in enumerate(objects):
+        for layer in layers:
+            grid = grids.get(layer)
+            if grid is None:
+                grid = grids[layer] = Grid(cell)
+            b = boxes[i]
+            for j in grid.near(b):
+                c = boxes[j]
+                if b[0] <= c[2] and c[0] <= b[2] and b[1] <= c[3] and c[1] <= b[3] and sets.find(i) != sets.find(j) and touch(shape, objects[j][1]):
+                    sets.union(i, j)
+            grid.add(i, boxes[i])
+    return sets
+
+def assignNets(kicad, stats = NOSTATS, only = None):
+    """ sets net of segments and vias connected to pads of exactly one net
+    objects connected to pads of several nets (shorts) are left without net
+    only, if given, is set of ids of objects which get net, nets of others are kept """
+    objects = copper(kicad)
+    sets = connect(objects)
+    nets = {}   #root -> set of (number, name) of pads
+    for i, (o, shape, layers) in enumerate(objects):
+        if isinstance(o, Pad) and getattr(o, 'net', None) is not None:
+            nets.setdefault(sets.find(i), set()).add(o.net)
+    assigned = 0
+    for i, (o, shape, layers) in enumerate(objects):
+        if isinstance(o, Pad) or only is not None and id(o) not in only:
+            continue
+        n = nets.get(sets.find(i))
+        if not n or len(n) != 1:
+            continue
+        num, name = next(iter(n))
+        if isinstance(o, Segment):
+            o.net = str(num)
+        else:
+            o.net = num
+        assigned += 1
+    stats.count('nets_assigned', assigned)
+    stats.count('shorts', sum(1 for n in nets.values() if len(n) > 1))
+    return assigned
+
+def zoneNets(pours, points, stats = NOSTATS):
+    """ sets nets of zones converted from gEDA polygons, pours are (zone, holes, clear) with point lists of holes of polygon
+    and clear True for polygons which clear around copper (clearpoly flag)
+    points are (x, y, (number, name), copper layers, thermal layers) of pads, pins and vias with net
+    clearing polygon joins only pins and vias with thermal on its layer, other polygons join all copper inside them
+    zone gets net when all points it joins, except ones inside its own holes, have same net
+    returns number of zones with net set """
+    if not pours or not points:
+        return 0
+    cell = cellSize([bbox(('p', z.pts)) for z, holes, clear in pours])
+    grids = {}  #(layer, clear) -> Grid of points joining polygons on layer
+    for i, (x, y, net, layers, thermals) in enumerate(points):
+        for key in [(l, False) for l in layers] + [(l, True) for l in thermals]:
+            grid = grids.get(key)
+            if grid is None:
+                grid = grids[key] = Grid(cell)
+            grid.add(i, (x, y, x, y))
+
+    assigned = conflicts = 0
+    for z, holes, clear in pours:
+        grid = grids.get((z.layer, clear))
+        if grid is None:
+            continue
+        x1, y1, x2, y2 = box = bbox(('p', z.pts))
+        holes = [(bbox(('p', h)), h) for h in holes]
+        nets = set()
+        for i in grid.near(box):
+            x, y, net = points[i][:3]
+            if net in nets or not (x1 <= x <= x2 and y1 <= y <= y2 and inside(x, y, z.pts)):
+                continue
+            if any(b[0] <= x <= b[2] and b[1] <= y <= b[3] and inside(x, y, h) for b, h in holes):
+                continue
+            nets.add(net)
+            if len(nets) > 1:
+                break
+        if len(nets) == 1:
+            z.net, z.net_name = nets.pop()
+            assigned += 1
+        elif nets:
+            conflicts += 1
+    stats.count('zone_nets', assigned)
+    stats.count('zone_conflicts', conflicts)
+    return assigned
+
+def onWire(x, y, w):
+    """ point lies on wire (x1, y1, x2, y2) but is not its end """
+    x1, y1, x2, y2 = w
+    return (x1 - x) * (y2 - y) == (x2 - x) * (y1 - y) and min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2) \
+        and (x, y) != (x1, y1) and (x, y) != (x2, y2)
+
+def wireCells(w, c):
+    """ cells of wire in hash of cell size c, horizontal and vertical wires are hashed by their line
+    so wires on parallel lines do not share cells however dense they are """
+    x1, y1, x2, y2 = w
+    if y1 == y2:
+        return [('h', y1, b) for b in range(int(min(x1, x2) // c), int(max(x1, x2) // c) + 1)]
+    if x1 == x2:
+        return [('v', x1, b) for b in range(int(min(y1, y2) // c), int(max(y1, y2) // c) + 1)]
+    return [('d', bx, by) for bx in range(int(min(x1, x2) // c), int(max(x1, x2) // c) + 1) for by in range(int(min(y1, y2) // c), int(max(y1, y2) // c) + 1)]
+
+def pointCells(x, y, c):
+    """ cells of wires which may go through point """
+    return [('h', y, int(x // c)), ('v', x, int(y // c)), ('d', int(x // c), int(y // c))]
+
+class WireIndex:
+    """ hash of schematic wires given as (x1, y1, x2, y2) for finding wires which go through points """
+    def __init__(self, wires):
+        self.wires = wires
+        lengths = sorted(max(abs(w[2] - w[0]), abs(w[3] - w[1])) for w in wires)
+        self.cell = c = max(lengths[len(lengths) // 2], 1) if lengths else 1
+        self.cells = cells = {}
+        for i, w in enumerate(wires):
+            for k in wireCells(w, c):
+                cells.setdefault(k, []).append(i)
+    def through(self, x, y):
+        """ indices of wires going through point but not ending there """
+        cells = self.cells
+        wires = self.wires
+        return [i for k in pointCells(x, y, self.cell) for i in cells.get(k, ()) if onWire(x, y, wires[i])]
+
+def wireEnds(wires):
+    """ point -> indices of wires ending there """
+    ends = {}
+    for i, w in enumerate(wires):
+        ends.setdefault((w[0], w[1]), []).append(i)
+        ends.setdefault((w[2], w[3]), []).append(i)
+    return ends
+
+def dangling(wires):
+    """ (index of wire, 0 for (x1, y1) or 1 for (x2, y2)) of wire ends which touch no other wire """
+    ends = wireEnds(wires)
+    index = WireIndex(wires)
+    r = []
+    for (x, y), at in ends.items():
+        if len(at) == 1 and not index.through(x, y):
+            w = wires[at[0]]
+            r.append((at[0], 0 if (w[0], w[1]) == (x, y) else 1))
+    return r
+
+def schematic(wires, pins = {}, labels = ()):
+    """ connectivity of schematic wires given as (x1, y1, x2, y2), time is linear in number of wires
+    wires are connected where they share end or where end of one lies on other one, pins are {key: (x, y)}
+    and labels (text, x, y) are connected to wires going through their points
+    returns (junctions, nets), junctions are points where three or more wires meet and which need junction dot,
+    nets are dicts with name (text of first label or None), indices of wires and keys of pins """
+    ends = wireEnds(wires)
+    through = WireIndex(wires).through
+
+    sets = UnionFind(len(wires) + len(pins))
+    junctions = []
+    for (x, y), at in ends.items():
+        mids = through(x, y)
+        for i in at[1:] + mids:
+            sets.union(at[0], i)
+        if len(at) + 2 * len(mids) >= 3:
+            junctions.append((x, y))
+    keys = list(pins)
+    for n, k in enumerate(keys):
+        x, y = pins[k]
+        for i in ends.get((x, y), []) + through(x, y):
+            sets.union(len(wires) + n, i)
+    names = {}  #root -> name
+    for text, x, y in labels:
+        for i in ends.get((x, y), []) + through(x, y):
+            names.setdefault(sets.find(i), text)
+    nets = {}   #root -> net
+    for i in range(len(wires) + len(keys)):
+        root = sets.find(i)
+        net = nets.get(root)
+        if net is None:
+            net = nets[root] = {'name': names.get(root), 'wires': [], 'pins': []}
+        if i < len(wires):
+            net['wires'].append(i)
+        else:
+            net['pins'].append(keys[i - len(wires)])
+    return junctions, list(nets.values())
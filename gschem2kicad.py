@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 #Script to convert geda schematics to kicad schematics
 
-import time, sys, os
+import time, sys, os, argparse
 myDir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.join(myDir, "parsers"))
 
-import gschem, eeschema
+import gschem, eeschema, cursor, cache, stats, connectivity
+from stats import NOSTATS
 
 components = {
     'vcc-2.sym':['power:VCC', 200, 0, 0],
@@ -29,6 +30,9 @@ orientConv = {
     (270, 1): [0, 1, -1, 0],
 }
 
+VERSION = cache.version(gschem, cursor, eeschema, connectivity, sys.modules[__name__])
+TABLES = (components, orientConv)   #part of cache key
+
 def coor(x,y):
     return x // 2, -y // 2  #TODO configurable scale TODO move inside page 
 
@@ -49,108 +53,142 @@ def emtpyField(x,y):
     f.style = 'CNN'
     return f
 
-if len(sys.argv) < 3:
-    print("usage\n%s gschem.sch kicad.sch" % sys.argv[0])
-    sys.exit(1)
-
-ts = int(time.time())
-
-gitems = gschem.load(sys.argv[1])
-eitems = []
-
-ver = eeschema.Version()
-ver.version = 4
-eitems.append(ver)
-
-layers = eeschema.Layers()
-layers.nn = 26
-layers.mm = 0
-eitems.append(layers)
-
-page = eeschema.Page()
-page.format = 'A4'
-page.dimx = 11693
-page.dimy = 8268
-page.fields = {}
-eitems.append(page)
-
-for gi in gitems:
-    if isinstance(gi, gschem.Net):
-        wire = eeschema.Wire()
-        wire.x1, wire.y1 = coor(gi.x1, gi.y1)
-        wire.x2, wire.y2 = coor(gi.x2, gi.y2)
-        wire.type = 'Wire'
-        eitems.append(wire)
-
-        con = eeschema.Connection()
-        con.x, con.y = coor(gi.x1, gi.y1)
-        eitems.append(con)
-
-        con = eeschema.Connection()
-        con.x, con.y = coor(gi.x2, gi.y2)
-        eitems.append(con)
-        if hasattr(gi, 'attributes'):
-            for a in gi.attributes:
-                k, v = a.text.split('=')
-                if k == 'netname':
-                    label = eeschema.Text()
-                    label.type = 'Label'
-                    label.shape = '~'
-                    label.x, label.y = coor(a.x, a.y)
-                    label.orientation = 0
-                    label.size = 50
-                    if v.startswith('\_') and v.endswith('\_') and len(v) > 3:
-                        v = '~' + v[2:-2]
-                    label.text = v
-                    eitems.append(label)
-
-    if isinstance(gi, gschem.Componnent):
-        if gi.basename in components:
-            name, xoff, yoff, aoff = components[gi.basename]
-            if gi.mirror:
-                xoff = -xoff
-            if gi.angle == 90:
-                xoff, yoff = -yoff, xoff
-            if gi.angle == 180:
-                xoff, yoff = -xoff, -yoff
-            if gi.angle == 270:
-                xoff, yoff = yoff, -xoff
-            component = eeschema.Componnent()
-            component.fields = []
-            component.ref = 'X'
-            for i in range(4):  #default fields
-                f =emtpyField(gi.x, gi.y)
-                component.fields.append(f)
+def gschem2kicad(gitems, stats = NOSTATS, nets = None):
+    """ nets, if given, is extended by net table of schematic, see connectivity.schematic """
+    ts = int(time.time())
+
+    eitems = []
+
+    ver = eeschema.Version()
+    ver.version = 4
+    eitems.append(ver)
+
+    layers = eeschema.Layers()
+    layers.nn = 26
+    layers.mm = 0
+    eitems.append(layers)
+
+    page = eeschema.Page()
+    page.format = 'A4'
+    page.dimx = 11693
+    page.dimy = 8268
+    page.fields = {}
+    eitems.append(page)
+
+    wires = []  #(x1, y1, x2, y2) for connectivity
+    labels = []
+
+    for gi in gitems:
+        if isinstance(gi, gschem.Net):
+            wire = eeschema.Wire()
+            wire.x1, wire.y1 = coor(gi.x1, gi.y1)
+            wire.x2, wire.y2 = coor(gi.x2, gi.y2)
+            wire.type = 'Wire'
+            eitems.append(wire)
+            wires.append((wire.x1, wire.y1, wire.x2, wire.y2))
             if hasattr(gi, 'attributes'):
                 for a in gi.attributes:
                     k, v = a.text.split('=')
-                    if k == 'refdes':
-                        component.ref = v
-                        text(component.fields[0], a, v)
-                    if k == 'value':
-                        text(component.fields[1], a, v)
-                    if k == 'footprint':
-                        text(component.fields[2], a, v)
-                    if k == 'mpn':
-                        f = emtpyField(gi.x, gi.y)
-                        f.name = 'mpn'
-                        text(f, a, v)
-                        component.fields.append(f)
-                    if k == 'manufacturer':
-                        f = emtpyField(gi.x, gi.y)
-                        f.name = 'manufacturer'
-                        text(f, a, v)
-                        component.fields.append(f)
+                    if k == 'netname':
+                        label = eeschema.Text()
+                        label.type = 'Label'
+                        label.shape = '~'
+                        label.x, label.y = coor(a.x, a.y)
+                        label.orientation = 0
+                        label.size = 50
+                        if v.startswith('\_') and v.endswith('\_') and len(v) > 3:
+                            v = '~' + v[2:-2]
+                        label.text = v
+                        eitems.append(label)
+                        labels.append((v, label.x, label.y))
+
+        if isinstance(gi, gschem.Componnent):
+            if gi.basename in components:
+                name, xoff, yoff, aoff = components[gi.basename]
+                if gi.mirror:
+                    xoff = -xoff
+                if gi.angle == 90:
+                    xoff, yoff = -yoff, xoff
+                if gi.angle == 180:
+                    xoff, yoff = -xoff, -yoff
+                if gi.angle == 270:
+                    xoff, yoff = yoff, -xoff
+                component = eeschema.Componnent()
+                component.fields = []
+                component.ref = 'X'
+                for i in range(4):  #default fields
+                    f =emtpyField(gi.x, gi.y)
+                    component.fields.append(f)
+                if hasattr(gi, 'attributes'):
+                    for a in gi.attributes:
+                        k, v = a.text.split('=')
+                        if k == 'refdes':
+                            component.ref = v
+                            text(component.fields[0], a, v)
+                        if k == 'value':
+                            text(component.fields[1], a, v)
+                        if k == 'footprint':
+                            text(component.fields[2], a, v)
+                        if k == 'mpn':
+                            f = emtpyField(gi.x, gi.y)
+                            f.name = 'mpn'
+                            text(f, a, v)
+                            component.fields.append(f)
+                        if k == 'manufacturer':
+                            f = emtpyField(gi.x, gi.y)
+                            f.name = 'manufacturer'
+                            text(f, a, v)
+                            component.fields.append(f)
                         
-            component.name = name
-            component.N = 1
-            component.mm = 1
-            component.ts = ts
-            ts += 1
-            component.x, component.y = coor(gi.x  + xoff, gi.y + yoff)
-            component.orientation = orientConv[((gi.angle + aoff) % 360, gi.mirror)]
-            eitems.append(component)
-        else:
-            print('Skipping', gi.basename)
-
-eeschema.save(sys.argv[2], eitems)
+                component.name = name
+                component.N = 1
+                component.mm = 1
+                component.ts = ts
+                ts += 1
+                component.x, component.y = coor(gi.x  + xoff, gi.y + yoff)
+                component.orientation = orientConv[((gi.angle + aoff) % 360, gi.mirror)]
+                eitems.append(component)
+            else:
+                print('Skipping', gi.basename)
+                stats.count('skipped')
+
+    junctions, table = connectivity.schematic(wires, labels = labels)
+    for x, y in junctions:
+        con = eeschema.Connection()
+        con.x, con.y = x, y
+        eitems.append(con)
+    if nets is not None:
+        nets.extend(table)
+    stats.count('junctions', len(junctions))
+    stats.count('nets', len(table))
+    if stats.enabled:
+        stats.count('components', sum(1 for i in eitems if isinstance(i, eeschema.Componnent)))
+        stats.count('wires', sum(1 for i in eitems if isinstance(i, eeschema.Wire)))
+    return eitems
+
+def convert(infile, outfile, stats = NOSTATS):
+    with stats.phase('parse'):
+        gitems = gschem.load(infile)
+    with stats.phase('convert'):
+        eitems = gschem2kicad(gitems, stats)
+    with stats.phase('save'):
+        eeschema.save(outfile, eitems)
+    stats.count('items', len(gitems))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Converts gschem schematic to kicad schematic.')
+    parser.add_argument('infile')
+    parser.add_argument('outfile')
+    cache.addArguments(parser)
+    stats.addArguments(parser)
+    args = parser.parse_args()
+
+    c = cache.fromArguments(args)
+    st = stats.fromArguments(args)
+    key = cache.conversionKey(c, args.infile, sys.modules[__name__])
+    if cache.convert(c, key, args.outfile, lambda: convert(args.infile, args.outfile, st)):
+        st.count('cache_hits')
+    if c:
+        print('cache hits %(hits)d, misses %(misses)d' % c.stats())
+    if st.enabled:
+        st.write(args.stats_file)
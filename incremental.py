@@ -0,0 +1,394 @@
+#Incremental re-conversion of gEDA PCB file, only objects changed since previous conversion are rewritten in existing kicad_pcb
+#so manual edits of other objects are kept
+#each converted kicad object gets tstamp, snapshot maps text of each gEDA object to tstamps of kicad objects made from it,
+#so kicad objects are found by identity even after they were moved or edited in pcbnew
+#both files are handled as text split to top level items, only changed items are parsed, converted and written
+
+import json, os, re, sys
+from collections import Counter
+from functools import lru_cache
+from itertools import count
+import parsepcb, pcb, parsekicad, kicad, connectivity, pcb2kicad, cache
+from parsepcb import Item
+from parsekicad import S
+from pcb import Pcb, Layer, Element, Netlist, Via as PcbVia
+from kicad import Kicad, Module, Segment, Line, Arc, Text, Zone, Via
+from stats import NOSTATS
+
+VERSION = cache.version(parsepcb, pcb, parsekicad, kicad, connectivity, pcb2kicad, sys.modules[__name__])
+
+#pcb writes top level items from start of line and objects of layers after single tab
+TOP = re.compile(r'\n(?=[^\s()\[\]])')
+CHILD = re.compile(r'\n(?=\t[^\s()\[\]])')
+NAME = re.compile(r'\w*')
+LAYER = re.compile(r'Layer\s*[\[(][^\n]*')
+REFDES = re.compile(r'Element\s*[\[(](?:"[^"]*"|\S+)\s+"[^"]*"\s+"([^"]*)"')
+TSTAMP = re.compile(r'\(tstamp ([0-9A-Fa-f]+)\)')
+
+#name of top level kicad item of each class
+NAMES = {Module: 'module', Segment: 'segment', Line: 'gr_line', Arc: 'gr_arc', Text: 'gr_text', Zone: 'zone', Via: 'via'}
+
+class Source:
+    """ text of gEDA board split to header items, netlist and objects
+    object is keyed by its text, object of layer by header line of its layer and its text """
+    def __init__(self, text):
+        self.header = []
+        self.netlist = ''
+        self.keys = []
+        for block in TOP.split(text):
+            block = block.strip()
+            name = kind(block)
+            if name in ('Element', 'Via'):
+                self.keys.append(block)
+            elif name == 'Layer':
+                parts = CHILD.split(block[:-1])     #without closing bracket of layer
+                head = LAYER.match(parts[0])
+                if head is None or not block.endswith(')') or parts[0][head.end():].strip() != '(':
+                    raise Exception('layer is not written as pcb writes it, convert without --incremental: %s' % parts[0][:40])
+                self.keys += [head.group(0) + '\n' + c.strip() for c in parts[1:]]
+            elif name == 'NetList':
+                self.netlist = block
+            elif block:
+                self.header.append(block)
+
+def kind(key):
+    return NAME.match(key).group(0)
+
+@lru_cache(maxsize = None)
+def isCopper(header):
+    return 'copper' in parse([header])[0].attributes[2].flags()
+
+def itemName(key):
+    """ name of top level kicad items converted from object of key """
+    name = kind(key)
+    if name == 'Element':
+        return 'module'
+    if name == 'Via':
+        return 'via'
+    header, text = key.split('\n', 1)
+    child = kind(text)
+    if child == 'Line':
+        return 'segment' if isCopper(header) else 'gr_line'
+    return {'Text': 'gr_text', 'Arc': 'gr_arc', 'Polygon': 'zone'}[child]
+
+def refdes(key):
+    m = REFDES.match(key)
+    return m.group(1) if m else ''
+
+def parse(texts):
+    return parsepcb.scanItems('\n'.join(texts))[0] if texts else []
+
+def connectionNames(netlist):
+    """ (refdes, pin number) -> net name for netlist text """
+    if not netlist:
+        return {}
+    return {(c.part, c.pin): n.name for n in Netlist(parse([netlist])[0]).nets for c in n.connects}
+
+def unquote(s):
+    return s[1:-1] if s.startswith('"') else s
+
+class Board:
+    """ text of kicad_pcb, its top level items are found by tstamp or name and edited without parsing the rest
+    span of item starts at newline before it and ends at its closing bracket """
+    def __init__(self, text):
+        self.text = text
+        m = re.search(r'\n([ \t]*)\(', text)
+        self.indent = m.group(1) if m else ' '
+        self.marker = '\n' + self.indent + '('
+        self.end = len(text[:len(text.rstrip()) - 1].rstrip())  #end of last item, before closing bracket of kicad_pcb
+        self.edits = []     #(start, end, text) replacing text[start:end]
+
+    def span(self, pos):
+        """ span of top level item containing pos """
+        start = self.text.rfind(self.marker, 0, pos)
+        end = self.text.find(self.marker, pos, self.end)
+        end = self.end if end == -1 else end
+        return start, start + len(self.text[start:end].rstrip())
+
+    def find(self, tstamps):
+        """ tstamp -> span of first top level item with it and with name given by tstamps {tstamp: name}
+        items of other kind with same tstamp, e.g. added in pcbnew, are skipped """
+        r = {}
+        if tstamps:
+            for m in TSTAMP.finditer(self.text):
+                t = int(m.group(1), 16)
+                if t in tstamps and t not in r:
+                    span = self.span(m.start())
+                    if NAME.match(self.text, span[0] + len(self.marker)).group(0) == tstamps[t]:
+                        r[t] = span
+        return r
+
+    def maxTstamp(self):
+        return max((int(m.group(1), 16) for m in TSTAMP.finditer(self.text)), default = 0)
+
+    def items(self, name):
+        """ (span, first atom) of top level items with name """
+        return [(self.span(m.end()), unquote(m.group(1)))
+            for m in re.finditer(re.escape(self.marker) + name + r'(?=[\s)])\s*("[^"]*"|[^\s()]*)', self.text)]
+
+    def parse(self, span):
+        s = self.text[span[0]:span[1]]
+        return parsekicad.parseS(s, s.index('(') + 1)[0]
+
+    def nets(self):
+        """ {name: number} of declared nets and end of last declaration, None when there is none """
+        r = {}
+        end = None
+        for m in re.finditer(re.escape(self.marker) + r'net (\d+) ("[^"]*"|[^\s()]*)\)', self.text):
+            r[unquote(m.group(2))] = int(m.group(1))
+            end = m.end()
+        return r, end
+
+    def objectsStart(self):
+        """ start of first net class or board object, missing settings and nets are inserted there """
+        m = re.search(re.escape(self.marker) + r'(?:net_class|module|gr_|segment|via|zone)', self.text)
+        return m.start() if m else self.end
+
+    def itemText(self, s):
+        return '\n' + ''.join(s.chunks(len(self.indent)))
+
+    def replace(self, span, text):
+        self.edits.append((span[0], span[1], text))
+
+    def insert(self, pos, text):
+        self.edits.append((pos, pos, text))
+
+    def patched(self):
+        out = []
+        pos = 0
+        for start, end, text in sorted(self.edits, key = lambda e: e[:2]):
+            out.append(self.text[pos:start])
+            out.append(text)
+            pos = end
+        out.append(self.text[pos:])
+        return ''.join(out)
+
+def itemS(obj):
+    return obj.toS(NAMES[type(obj)])
+
+def emptyBoard(source):
+    """ kicad_pcb text with settings and nets of gEDA board but without objects """
+    board = Pcb(parse(source.header + [source.netlist]))
+    k = Kicad()
+    k.version = '20171130'
+    k.host = ['pcbnew', '5.0.0']
+    pcb2kicad.kicadSettings(k, board)
+    for i, n in enumerate(board.netlist.nets if source.netlist else [], 1):
+        k.nets[i] = n.name
+    return ''.join(k.chunks())
+
+def patchSettings(board, oldHeader, header):
+    """ rewrites design rules in setup and net classes of styles of gEDA board, other settings and net classes are kept """
+    styles = Pcb(parse(oldHeader)).styles
+    stub = Kicad()
+    pcb2kicad.kicadSettings(stub, Pcb(parse(header)))
+    setup = board.items('setup')
+    if setup:
+        span = setup[0][0]
+        text = board.text[span[0]:span[1]]
+        for s in stub.setup.fieldsToS():
+            item = ''.join(s.chunks())
+            text, n = re.subn(r'\(%s [^()]*\)' % s.name, lambda m: item, text, 1)
+            if not n:
+                text = text[:-1] + ' ' + item + ')'
+        board.replace(span, text)
+    else:
+        board.insert(board.objectsStart(), board.itemText(stub.setup.toS('setup')))
+    names = {s.name for s in styles} | {c.name for c in stub.classes}
+    classes = [span for span, name in board.items('net_class') if name in names]
+    for span in classes:
+        board.replace(span, '')
+    board.insert(classes[0][0] if classes else board.objectsStart(), ''.join(board.itemText(c.toS('net_class')) for c in stub.classes))
+
+def setNet(obj, net, name = 'net'):
+    """ unset nets are left out of kicad file """
+    if net is not None:
+        setattr(obj, name, net)
+    elif hasattr(obj, name):
+        delattr(obj, name)
+
+def setPadNets(module, ref, connections):
+    for p in module.pads:
+        setNet(p, connections.get((ref, p.name)))
+
+def kicadModule(e, connections):
+    m = pcb2kicad.kicadModule(e, iter(pcb2kicad.geometry('pads', e.pads)), iter(pcb2kicad.geometry('arcs', e.arcs)))
+    setPadNets(m, e.name, connections)
+    return m
+
+def layerObjects(keys):
+    """ list of kicad objects converted from each key of layer object """
+    layers = {}     #header line -> [(index of key, text of object)]
+    for i, k in enumerate(keys):
+        header, text = k.split('\n', 1)
+        layers.setdefault(header, []).append((i, text))
+    r = [None] * len(keys)
+    for header, objects in layers.items():
+        items = parse([text for i, text in objects])
+        layer = Layer(Item('Layer', parse([header])[0].attributes, True, items))
+        scratch = Kicad()
+        pcb2kicad.kicadLayer(scratch, layer)
+        converted = {   #kicadLayer converts objects of each kind in their order
+            'Line': iter(scratch.segments if 'copper' in layer.flags else scratch.lines),
+            'Text': iter(scratch.texts),
+            'Arc': iter(scratch.arcs)}
+        polygons = iter(layer.polygons)
+        zones = iter(scratch.zones)
+        for (i, text), item in zip(objects, items):
+            if item.name == 'Polygon':
+                r[i] = [next(zones) for z in range(1 + len(next(polygons).holes))]    #pour and keepouts of its holes
+            else:
+                r[i] = [next(converted[item.name])]
+    return r
+
+def diff(old, keys):
+    """ kept {key: tstamp lists} of objects both in old snapshot objects and keys, removed (key, tstamps) and added keys
+    repeated keys are counted """
+    kept = {}
+    added = []
+    for k, c in Counter(keys).items():
+        kept[k] = old.get(k, [])[:c]
+        added += [k] * (c - len(kept[k]))
+    removed = [(k, t) for k, tstamps in old.items() for t in tstamps[len(kept.get(k, ())):]]
+    return kept, removed, added
+
+def patch(text, old, source, stats = NOSTATS):
+    """ updates text of kicad_pcb converted from gEDA board of old snapshot to board of source
+    returns new text, new snapshot and tstamps of added segments and vias """
+    board = Board(text)
+    kept, removed, added = diff(old['objects'], source.keys)
+    objects = {k: t for k, t in kept.items() if t}
+    tstamps = count(max(old['next'], board.maxTstamp() + 1))    #above tstamps of objects added in pcbnew
+    if old['header'] != source.header:
+        patchSettings(board, old['header'], source.header)
+
+    #declared nets keep their numbers, new nets are numbered after them
+    elements = [k for k in added if kind(k) == 'Element']
+    netlistChanged = old['netlist'] != source.netlist
+    names = connectionNames(source.netlist) if elements or netlistChanged else {}
+    numbers, last = board.nets()
+    new = [n for n in dict.fromkeys(names.values()) if n not in numbers]
+    if new:
+        first = max(numbers.values(), default = 0) + 1
+        board.insert(board.objectsStart() if last is None else last,
+            ''.join(board.itemText(S('net', [str(i), n])) for i, n in enumerate(new, first)))
+        numbers.update(zip(new, count(first)))
+    connections = {c: (numbers[n], n) for c, n in names.items()}
+
+    #pads of modules of unchanged elements get new nets, other edits of these modules are kept
+    if netlistChanged:
+        oldNames = connectionNames(old['netlist'])
+        parts = {c[0] for c, n in set(oldNames.items()) ^ set(names.items())}
+        refs = {t[0]: refdes(k) for k, l in objects.items() if kind(k) == 'Element' and refdes(k) in parts for t in l}
+        for t, span in board.find(dict.fromkeys(refs, 'module')).items():
+            m = Module()
+            m.loadS(board.parse(span))
+            setPadNets(m, refs[t], connections)
+            board.replace(span, board.itemText(m.toS('module')))
+        stats.count('module_nets_updated', len(refs))
+
+    spans = board.find({t: itemName(k) for k, l in removed for t in l})
+    removedModules = {}     #refdes -> tstamps of modules of removed elements
+    for k, l in removed:
+        if kind(k) == 'Element':
+            removedModules.setdefault(refdes(k), []).append(l[0])
+        else:
+            for t in l:
+                if t in spans:
+                    board.replace(spans[t], '')
+            stats.count('objects_removed')
+
+    #changed element keeps tstamp and place of module of removed element with same refdes
+    appended = []
+    for k, item in zip(elements, parse(elements)):
+        m = kicadModule(Element(item), connections)
+        reused = removedModules.get(refdes(k))
+        t = reused.pop() if reused else None
+        if t in spans:
+            m.tstamp = t
+            board.replace(spans[t], board.itemText(itemS(m)))
+        else:   #module was deleted in pcbnew
+            m.tstamp = next(tstamps)
+            appended.append(board.itemText(itemS(m)))
+        objects.setdefault(k, []).append([m.tstamp])
+    for l in removedModules.values():
+        for t in l:
+            if t in spans:
+                board.replace(spans[t], '')
+            stats.count('modules_removed')
+    stats.count('modules_rewritten', len(elements))
+
+    copper = set()  #tstamps of added segments and vias
+    layerKeys = [k for k in added if kind(k) == 'Layer']
+    vias = [k for k in added if kind(k) == 'Via']
+    converted = list(zip(layerKeys, layerObjects(layerKeys))) + [(k, [pcb2kicad.kicadVia(PcbVia(item))]) for k, item in zip(vias, parse(vias))]
+    for k, l in converted:
+        for o in l:
+            o.tstamp = next(tstamps)
+            appended.append(board.itemText(itemS(o)))
+            if isinstance(o, (Segment, Via)):
+                copper.add(o.tstamp)
+        objects.setdefault(k, []).append([o.tstamp for o in l])
+    stats.count('objects_added', len(converted))
+    board.insert(board.end, ''.join(appended))
+
+    snapshot = {'version': VERSION, 'header': source.header, 'netlist': source.netlist, 'objects': objects, 'next': next(tstamps)}
+    print('%d modules and objects rewritten' % (len(elements) + len(converted)))
+    return board.patched(), snapshot, copper
+
+def assignNets(text, tstamps, stats = NOSTATS):
+    """ assigns nets of pads to segments and vias with tstamps, see connectivity.assignNets
+    nets of other objects are kept, so nets edited in pcbnew are not overwritten """
+    stub = Kicad()
+    lists = {'module': stub.modules, 'segment': stub.segments, 'via': stub.vias}
+    for name, obj in kicad.streamItems(parsekicad.scanEvents(text), tuple(lists)):
+        lists[name].append(obj)
+    only = {id(o): o for o in stub.segments + stub.vias if getattr(o, 'tstamp', None) in tstamps}
+    print('nets assigned to %d segments and vias' % connectivity.assignNets(stub, stats, only))
+    board = Board(text)
+    changed = {o.tstamp: o for o in only.values() if getattr(o, 'net', None) is not None}
+    for t, span in board.find({t: NAMES[type(o)] for t, o in changed.items()}).items():
+        board.replace(span, board.itemText(itemS(changed[t])))
+    return board.patched()
+
+def snapshotPath(outfile):
+    return outfile + '.snapshot'
+
+def loadSnapshot(path):
+    """ snapshot saved by previous conversion, None if there is none or it is from other version of converter """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        s = json.load(f)
+    return s if s.get('version') == VERSION else None
+
+def saveSnapshot(path, s):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(s, f)
+    os.replace(tmp, path)
+
+def convert(infile, outfile, stats = NOSTATS, nets = False):
+    """ converts infile to outfile, when outfile was converted before with snapshot only changes are written into it
+    snapshot of converted board is saved next to outfile """
+    path = snapshotPath(outfile)
+    with stats.phase('parse'):
+        with open(infile) as f:
+            source = Source(f.read())
+    old = loadSnapshot(path) if os.path.exists(outfile) else None
+    if old is None:
+        print('no snapshot of previous conversion, converting whole board')
+        text = emptyBoard(source)
+        old = {'header': source.header, 'netlist': source.netlist, 'objects': {}, 'next': 1}
+    else:
+        with stats.phase('load'):
+            with open(outfile) as f:
+                text = f.read()
+    with stats.phase('convert'):
+        text, snapshot, copper = patch(text, old, source, stats)
+        if nets and copper:
+            text = assignNets(text, copper, stats)
+    with stats.phase('save'):
+        with open(outfile, 'w') as f:
+            f.write(text)
+        saveSnapshot(path, snapshot)
@@ -1,4 +1,5 @@
-from parsekicad import load, distance, save, S, nm
+import gc
+from parsekicad import load, distance, save, S, nm, events, collect, skip, START
 
 class StringField:
     def loadS(s, parent):
@@ -17,9 +18,11 @@ class ClassField:
         return parent.__getattribute__(name).toS(name)
 
 class ArrayField:
+    many = True #toS returns list
     def __init__(self, c, name):
         self.c = c
         self.name = name
+        self.attrs = (name,)
     def loadS(self, s, parent):
         obj = self.c()
         obj.loadS(s)
@@ -34,12 +37,15 @@ class ArrayField:
         return items
 
 class LayersField:
+    attrs = ('layers',)
     def loadS(s, parent):
         parent.layers = [Layer(int(l.name), l.items[0], l.items[1]) for l in s.items]
     def toS(parent, name):
         return S(name, [S(str(l.num), [l.name, l.t]) for l in parent.layers])
 
 class NetsField:
+    attrs = ('nets',)
+    many = True
     def loadS(s, parent):
         parent.nets[int(s.items[0])] = s.items[1]
     def toS(parent, name):
@@ -81,6 +87,8 @@ class HexField:
     def toS(parent, name):
         return S(name, [hex(parent.__getattribute__(name))[2:].upper()])
 class NetArrayField:
+    attrs = ('nets',)
+    many = True
     def loadS(s, parent):
         parent.nets.append(s.items[0])
     def toS(parent, name):
@@ -103,6 +111,7 @@ class PosField:
         else:
             return S(name, [nm(f[0]), nm(f[1])])
 class FontField:
+    attrs = ('size', 'thickness', 'italic')
     def loadS(s, parent):
         parent.italic = False
         for c in s.items:
@@ -121,6 +130,7 @@ class FontField:
         return S(name, i)
 
 class LayerSelectionField:
+    attrs = ('lselect1', 'lselect2')
     def loadS(s, parent):
         l1, l2 = s.items[0].split('_')
         parent.lselect1 = int(l1[2:], 16)
@@ -147,12 +157,14 @@ class FloatField:
     def toS(parent, name):
         return S(name, [str(parent.__getattribute__(name))])
 class HatchField:
+    attrs = ('hatchtype', 'hatchsize')
     def loadS(s, parent):
         parent.hatchtype = s.items[0]
         parent.hatchsize = distance(s.items[1])
     def toS(parent, name):
         return S(name, [parent.hatchtype, nm(parent.hatchsize)])
 class ConnectField:
+    attrs = ('connect', 'clearance')
     def loadS(s, parent):
         if s.items[0] in ['no', 'yes', 'thru_hole_only']:
             parent.connect = s.items[0]
@@ -167,6 +179,7 @@ class ConnectField:
         i = [ parent.connect ] if parent.connect != 'thermal' else []
         return S(name, i + [S('clearance', [nm(parent.clearance)])])
 class KeepoutsField:
+    attrs = ('keepouts',)
     def loadS(s, parent):
         parent.keepouts = set()
         for i in s.items:
@@ -176,6 +189,7 @@ class KeepoutsField:
     def toS(parent, name):
         return S(name, [ S(k, ['not_allowed']) for k in parent.keepouts])
 class PointsField:
+    attrs = ('pts',)
     def loadS(s, parent):
         parent.pts = []
         if s.items[0].name != 'pts':
@@ -187,26 +201,40 @@ class PointsField:
     def toS(parent, name):
         return S(name, [ S('pts', [ S('xy', [nm(p[0]), nm(p[1])]) for p in parent.pts]) ])
 
+MISSING = object()
+
+def compileFieldsToS(fields):
+    """ fieldsToS function specialized for fields table, field is skipped when attribute it reads
+    (its attrs, default is its name) is missing, values are saved as they are even when they are None """
+    table = [(name, field.toS, getattr(field, 'attrs', (name,)), getattr(field, 'many', False)) for name, field in fields.items()]
+    def fieldsToS(self):
+        r = []
+        for name, toS, attrs, many in table:
+            for a in attrs:
+                if getattr(self, a, MISSING) is MISSING:    #blank fields are skipped
+                    break
+            else:
+                if many:
+                    r += toS(self, name)    #can return array
+                else:
+                    r.append(toS(self, name))
+        return r
+    return fieldsToS
+
 class Loadable:
+    """ fields table of each subclass is compiled to loaders and fieldsToS when the class is defined """
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        cls.loaders = {name: field.loadS for name, field in cls.fields.items()}
+        cls.fieldsToS = compileFieldsToS(cls.fields)
     def loadS(self,s):
         self.loadFields(s.items)
     def toS(self, name):
         return S(name, self.fieldsToS())
     def loadFields(self, items):
+        loaders = self.loaders
         for i in items:
-            self.fields[i.name].loadS(i, self)
-    def fieldsToS(self):
-        r = []
-        for name,field in self.fields.items():
-            try:
-                s = field.toS(self, name)
-                if isinstance(s, S):
-                    r.append(s)
-                else:
-                    r += s  #can return array
-            except AttributeError:  #blank fields are skipped
-                pass
-        return r
+            loaders[i.name](i, self)
 
 
 class General(Loadable):
@@ -318,6 +346,7 @@ class Text(Loadable):
     fields = {
             'at' : PosField,
             'layer' : StringField,
+            'tstamp' : HexField,
             'effects' : ClassField(Effects)
             }
     def loadS(self, s):
@@ -342,6 +371,7 @@ class Line(Loadable):
             'end' : PosField,
             'layer' : StringField,
             'width' : DistanceField,
+            'tstamp' : HexField
             }
 
 class Segment(Loadable):
@@ -360,7 +390,8 @@ class Arc(Loadable):
             'end' : PosField,
             'angle' : FloatField,
             'layer' : StringField,
-            'width' : DistanceField
+            'width' : DistanceField,
+            'tstamp' : HexField
             }
 
 class Circle(Loadable):
@@ -393,7 +424,8 @@ class Via(Loadable):
             'size' : DistanceField,
             'drill' : DistanceField,
             'layers' : FlagField,
-            'net' : IntField
+            'net' : IntField,
+            'tstamp' : HexField
             }
 
 class Model(Loadable):
@@ -495,14 +527,77 @@ class Kicad(Loadable):
         self.zones = []
         self.segments = []
     def toS(self):
-        return S('kicad_pcb', self.fieldsToS())
+        enabled = gc.isenabled()
+        gc.disable()    #tree has no cycles, collector would only rescan it over and over
+        try:
+            return S('kicad_pcb', self.fieldsToS())
+        finally:
+            if enabled:
+                gc.enable()
     def loadS(self, s):
         if s.name != 'kicad_pcb':
             raise Exception('Unknown format')
         self.loadFields(s.items)
-    def load(self, path):
-        s = load(path)
-        self.loadS(s)
+    def load(self, path, mapped = False):
+        enabled = gc.isenabled()
+        gc.disable()    #same as in toS, loaded tree has no cycles
+        try:
+            s = load(path, mapped)
+            self.loadS(s)
+        finally:
+            if enabled:
+                gc.enable()
     def save(self, path):
         s = self.toS()
         save(path, s)
+    def chunks(self):
+        """ serialized file as generator of text chunks """
+        return self.toS().chunks()
+
+STREAMED = {
+    'module': Module,
+    'segment': Segment,
+    'via': Via,
+    'zone': Zone,
+}
+
+def iterItems(path, names = tuple(STREAMED)):
+    """ yields (name, object) for top level items of kicad_pcb file with given names one at a time
+    other items are skipped without building them, so whole board is never in memory """
+    return streamItems(events(path, 'kicad_pcb'), names)
+
+def streamItems(e, names = tuple(STREAMED)):
+    """ same as iterItems for events of kicad_pcb list, e.g. scanEvents of text """
+    next(e)
+    for kind, name in e:
+        if kind == START:
+            if name in names:
+                obj = STREAMED[name]()
+                obj.loadS(collect(e, name))
+                yield name, obj
+            else:
+                skip(e)
+
+def modules(path):
+    return (o for n, o in iterItems(path, ('module',)))
+
+def segments(path):
+    return (o for n, o in iterItems(path, ('segment',)))
+
+def vias(path):
+    return (o for n, o in iterItems(path, ('via',)))
+
+def zones(path):
+    return (o for n, o in iterItems(path, ('zone',)))
+
+def nets(path):
+    """ yields (number, name) of nets declared in kicad_pcb file """
+    e = events(path, 'kicad_pcb')
+    next(e)
+    for kind, name in e:
+        if kind == START:
+            if name == 'net':
+                s = collect(e, name)
+                yield int(s.items[0]), s.items[1]
+            else:
+                skip(e)
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
-import time, sys, os
+import time, sys, os, argparse
+from math import hypot
 
 myDir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.join(myDir, "parsers"))
 
-import ltspice, eeschema
+import ltspice, eeschema, cursor, cache, stats, connectivity
+from stats import NOSTATS
 
 components = {
     'nmos':['Device:Q_NMOS_GDS', 10, 10, 0],
@@ -29,6 +31,54 @@ orientConv = {
     (270, 1): [0, 1, -1, 0],
 }
 
+#pin records of kicad 5 library symbols placed by converter, X name number x y length direction ...
+#x y is connection point of pin in symbol coordinates (y up), schematic refers to these symbols by name
+SYMBOLS = {
+    'Device:Q_NMOS_GDS': """
+        X G 1 -200 0 200 R 50 50 1 1 I
+        X D 2 100 200 100 D 50 50 1 1 P
+        X S 3 100 -200 100 U 50 50 1 1 P""",
+    'Device:Q_PMOS_GDS': """
+        X G 1 -200 0 200 R 50 50 1 1 I
+        X D 2 100 -200 100 U 50 50 1 1 P
+        X S 3 100 200 100 D 50 50 1 1 P""",
+    'pspice:VSOURCE': """
+        X E1 1 0 600 300 D 50 50 1 1 I
+        X E2 2 0 -600 300 U 50 50 1 1 I""",
+    'Device:L': """
+        X 1 1 0 150 50 D 50 50 1 1 P
+        X 2 2 0 -150 50 U 50 50 1 1 P""",
+    'Device:C': """
+        X ~ 1 0 150 110 D 50 50 1 1 P
+        X ~ 2 0 -150 110 U 50 50 1 1 P""",
+    'Device:R': """
+        X ~ 1 0 150 50 D 50 50 1 1 P
+        X ~ 2 0 -150 50 U 50 50 1 1 P""",
+    'power:VCC': """
+        X VCC 1 0 0 0 U 50 50 1 1 W N""",
+    'power:GND': """
+        X GND 1 0 0 0 D 50 50 1 1 W N""",
+    'power:PWR_FLAG': """
+        X pwr 1 0 0 0 U 50 50 0 0 w""",
+}
+
+def symbolPins(records):
+    """ (number, x, y) of pins from X records of library symbol """
+    pins = []
+    for line in records.splitlines():
+        f = line.split()
+        if f and f[0] == 'X':
+            pins.append((f[2], int(f[3]), int(f[4])))
+    return pins
+
+#pins of kicad symbols as (number, x, y) in symbol coordinates
+PINS = {name: symbolPins(records) for name, records in SYMBOLS.items()}
+
+SNAP = 50   #default distance in mils from which dangling wire ends are snapped to pins, half of pin pitch
+
+VERSION = cache.version(ltspice, cursor, eeschema, connectivity, sys.modules[__name__])
+TABLES = (components, orientConv)   #part of cache key
+
 def warn(msg):
     print("[WARN]LTSpice2KiCad:", msg)
 
@@ -51,16 +101,57 @@ def emtpyField(x,y):
     f.style = 'CNN'
     return f
 
-if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        print("usage\n%s ltspice.sch kicad.sch" % sys.argv[0])
-        sys.exit(1)
-    
+def pinPositions(component):
+    """ (number, x, y) of pins of placed component in schematic coordinates """
+    a, b, c, d = component.orientation
+    return [(n, component.x + a * x + b * y, component.y + c * x + d * y) for n, x, y in PINS.get(component.name, [])]
+
+def snap(wires, pins, tolerance, stats = NOSTATS):
+    """ moves dangling ends of eeschema wires to nearest pin (x, y) not farther than tolerance
+    ends with several nearest pins are left as they are
+    end is moved along wire when pin lies on line of wire, otherwise new wire from end to pin is returned in list """
+    if tolerance <= 0 or not pins:
+        return []
+    points = [(w.x1, w.y1, w.x2, w.y2) for w in wires]
+    grid = connectivity.Grid(tolerance)
+    for i, (x, y) in enumerate(pins):
+        grid.add(i, (x, y, x, y))
+    added = []
+    moved = 0
+    for i, end in connectivity.dangling(points):
+        x1, y1, x2, y2 = points[i]
+        if end:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        best, pin, tie = tolerance, None, False
+        for j in grid.near((x1 - tolerance, y1 - tolerance, x1 + tolerance, y1 + tolerance)):
+            d = hypot(pins[j][0] - x1, pins[j][1] - y1)
+            if d < best or pin is None and d == best:
+                best, pin, tie = d, pins[j], False
+            elif d == best and pins[j] != pin:
+                tie = True
+        if pin is None or tie or pin == (x1, y1):
+            continue
+        px, py = pin
+        if (x1 - x2) * (py - y2) == (y1 - y2) * (px - x2) and (px, py) != (x2, y2):   #extend or shorten along wire
+            if end:
+                wires[i].x2, wires[i].y2 = px, py
+            else:
+                wires[i].x1, wires[i].y1 = px, py
+            moved += 1
+        else:
+            wire = eeschema.Wire()
+            wire.x1, wire.y1 = x1, y1
+            wire.x2, wire.y2 = px, py
+            wire.type = 'Wire'
+            added.append(wire)
+    stats.count('snapped', moved + len(added))
+    return added
+
+def ltspice2kicad(gitems, stats = NOSTATS, nets = None, tolerance = SNAP):
+    """ nets, if given, is extended by net table of schematic, see connectivity.schematic
+    dangling wire ends are snapped to kicad pins not farther than tolerance mils """
     ts = int(time.time())
     
-    components = ltspice.components
-    
-    gitems = ltspice.load(sys.argv[1])
     eitems = []
     
     ver = eeschema.Version()
@@ -78,6 +169,10 @@ if __name__ == '__main__':
     page.dimy = 8268
     page.fields = {}
     eitems.append(page)
+
+    wires = []  #eeschema wires
+    pins = {}   #(ref, pin number, index of component) -> (x, y)
+    labels = []
     
     for gi in gitems:
         if isinstance(gi, ltspice.Wire):
@@ -86,14 +181,7 @@ if __name__ == '__main__':
             wire.x2, wire.y2 = coor(gi.x2, gi.y2)
             wire.type = 'Wire'
             eitems.append(wire)
-    
-            con = eeschema.Connection()
-            con.x, con.y = coor(gi.x1, gi.y1)
-            eitems.append(con)
-    
-            con = eeschema.Connection()
-            con.x, con.y = coor(gi.x2, gi.y2)
-            eitems.append(con)
+            wires.append(wire)
             if hasattr(gi, 'attributes'):
                 for a in gi.attributes:
                     k, v = a.text.split('=')
@@ -108,10 +196,12 @@ if __name__ == '__main__':
                             v = '~' + v[2:-2]
                         label.text = v
                         eitems.append(label)
+                        labels.append((v, label.x, label.y))
                         
         if isinstance(gi, ltspice.Flag):
             if not gi.basename in components:
                 warn('Changing Flag '+ gi.basename +' to *, as no mapping was found.')
+                stats.count('unmapped')
                 gi.basename = '*'
             if gi.basename in components:
                 name, xoff, yoff, aoff = components[gi.basename]
@@ -150,8 +240,11 @@ if __name__ == '__main__':
                 component.x, component.y = coor(gi.x  + xoff, gi.y + yoff)
                 component.orientation = orientConv[((gi.angle + aoff) % 360, 0)]
                 eitems.append(component)
+                for n, x, y in pinPositions(component):
+                    pins[(component.ref, n, len(eitems))] = (x, y)
             else:
                 warn('Skipping Flag - '+ gi.basename)
+                stats.count('skipped')
     
         if isinstance(gi, ltspice.Component):
             if gi.basename in components:
@@ -199,7 +292,53 @@ if __name__ == '__main__':
                 component.x, component.y = coor(gi.x  + xoff, gi.y + yoff)
                 component.orientation = orientConv[((gi.angle + aoff) % 360, gi.mirror)]
                 eitems.append(component)
+                for n, x, y in pinPositions(component):
+                    pins[(component.ref, n, len(eitems))] = (x, y)
             else:
                 warn('Skipping component - '+ gi.basename)
-    
-    eeschema.save(sys.argv[2], eitems)
+                stats.count('skipped')
+
+    added = snap(wires, list(set(pins.values())), tolerance, stats)
+    eitems.extend(added)
+    wires = [(w.x1, w.y1, w.x2, w.y2) for w in wires + added]
+    junctions, table = connectivity.schematic(wires, pins, labels)
+    for x, y in junctions:
+        con = eeschema.Connection()
+        con.x, con.y = x, y
+        eitems.append(con)
+    if nets is not None:
+        nets.extend(table)
+    stats.count('junctions', len(junctions))
+    stats.count('nets', len(table))
+    if stats.enabled:
+        stats.count('components', sum(1 for i in eitems if isinstance(i, eeschema.Componnent)))
+        stats.count('wires', sum(1 for i in eitems if isinstance(i, eeschema.Wire)))
+    return eitems
+
+def convert(infile, outfile, stats = NOSTATS, tolerance = SNAP):
+    with stats.phase('parse'):
+        gitems = ltspice.load(infile)
+    with stats.phase('convert'):
+        eitems = ltspice2kicad(gitems, stats, tolerance = tolerance)
+    with stats.phase('save'):
+        eeschema.save(outfile, eitems)
+    stats.count('items', len(gitems))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Converts LTspice schematic to kicad schematic.')
+    parser.add_argument('infile')
+    parser.add_argument('outfile')
+    parser.add_argument('--snap', type = int, default = SNAP, metavar = 'MILS', help = 'snap dangling wire ends to pins not farther than MILS, 0 disables (default: %(default)s)')
+    cache.addArguments(parser)
+    stats.addArguments(parser)
+    args = parser.parse_args()
+
+    c = cache.fromArguments(args)
+    st = stats.fromArguments(args)
+    key = cache.conversionKey(c, args.infile, sys.modules[__name__], tolerance = args.snap)
+    if cache.convert(c, key, args.outfile, lambda: convert(args.infile, args.outfile, st, tolerance = args.snap)):
+        st.count('cache_hits')
+    if c:
+        print('cache hits %(hits)d, misses %(misses)d' % c.stats())
+    if st.enabled:
+        st.write(args.stats_file)
@@ -1,10 +1,17 @@
 import re
+import gc
+import mmap
 WHITESPACE = re.compile("[ \r\t\n]*")
 NAME = re.compile("[^ \r\t\n)]+") 
 STRING = re.compile('"([^"]*)"')
 CHAR = re.compile("'(.)'")
 NUMBER = re.compile('(-?[\d.]+)(mil|mm)?')
 ITEMSSTART = re.compile('[ \r\t\n]*\(')
+TOKEN = re.compile('[ \r\t\n]*(?:(\\()|(\\))|"([^"]*(?:""[^"]*)*)"|([^ \r\t\n)]+))')  #open, close, quoted, name
+BTOKEN = re.compile(TOKEN.pattern.encode())
+NONAME = object()
+QUOTE = re.compile('[() \t]')
+CHUNK = 8192
 
 class S:
     def __init__(self, name, items):
@@ -13,55 +20,175 @@ class S:
     def __repr__(self):
         return '%s:%r' % (self.name, self.items)
 
-    def save(self, f, level):
-        f.write(' ' * level)
-        f.write('(')
-        f.write(self.name)
-        for i in self.items:
-            if isinstance(i, S):
-                f.write('\n')
-                i.save(f, level + 1)
-            else:
-                f.write(' ')
+    def save(self, f, level = 0):
+        for c in self.chunks(level):
+            f.write(c)
+
+    def chunks(self, level = 0, size = CHUNK):
+        """ yields serialized text in chunks of about size pieces, without recursion """
+        out = [' ' * level, '(', self.name]
+        stack = []
+        items = iter(self.items)
+        while True:
+            for i in items:
+                if isinstance(i, S):
+                    level += 1
+                    out.append('\n' + ' ' * level + '(')
+                    out.append(i.name)
+                    stack.append(items)
+                    items = iter(i.items)
+                    break
                 if not i:
-                    f.write('""')
-                elif '(' in i or ')' in i or ' ' in i or '\t' in i:
-                    f.write('"')
-                    f.write(i)
-                    f.write('"')
+                    out.append(' ""')
+                elif QUOTE.search(i):
+                    out.append(' "' + i + '"')
                 else:
-                    f.write(i)
-        f.write(')')
+                    out.append(' ' + i)
+            else:
+                out.append(')')
+                if not stack:
+                    break
+                items = stack.pop()
+                level -= 1
+            if len(out) >= size:
+                yield ''.join(out)
+                out = []
+        yield ''.join(out)
 
-def parseQuoted(s, idx):
-    start = idx
-    while True:
-        if s[idx] == '"':
-            idx += 1
-            if s[idx] != '"':
-                return s[start:idx-1], idx
-        idx += 1
-
-def parseItem(s, idx):
-    idx = WHITESPACE.match(s,idx).end()
-    if s[idx] == ')':
-        return None, idx + 1
-    if s[idx] == '"':
-        return parseQuoted(s, idx + 1)
-    if s[idx] == '(':
-        return parseS(s, idx + 1)
-    e = NAME.match(s, idx).end()
-    return s[idx:e], e
-
-
-def parseS(s, idx):
-    name, idx =  parseItem(s,idx)
+def tokenizer(s, idx):
+    """ match function of TOKEN scanner of s from idx and whether tokens must be decoded
+    used by parseS and scanEvents so both read same tokens, s may be str or bytes buffer """
+    decode = not isinstance(s, str)
+    return (BTOKEN if decode else TOKEN).scanner(s, idx).match, decode
+
+def parseS(s, idx, atoms = None):
+    """ parses list after its opening bracket at idx without recursion
+    s may be str or bytes buffer, only kept tokens are decoded from bytes
+    list starting with list has name None, same as in scanEvents
+    atoms caches names and values so repeated ones are shared """
+    match, decode = tokenizer(s, idx)
+    if atoms is None:
+        atoms = {}
+    stack = []
+    name = NONAME
     items = []
+    enabled = gc.isenabled()
+    gc.disable()    #tree has no cycles, collector would only rescan it over and over
+    try:
+        while True:
+            r = match()
+            if r is None:
+                raise Exception('unexpected end of file')
+            t = r.lastindex
+            if t == 1:
+                if name is NONAME:
+                    name = None
+                stack.append((name, items))
+                name = NONAME
+                items = []
+                continue
+            if t == 2:
+                value = S(None if name is NONAME else name, items)
+                if not stack:
+                    return value, r.end()
+                name, items = stack.pop()
+            elif t == 3:    #doubled quotes are kept as they are
+                value = r.group(3)
+                if decode:
+                    value = value.decode()
+            else:
+                a = r.group(4)
+                value = atoms.get(a)
+                if value is None:
+                    value = atoms[a] = a.decode() if decode else a
+            if name is NONAME:
+                name = value
+            else:
+                items.append(value)
+    finally:
+        if enabled:
+            gc.enable()
+
+START, ATOM, END = 0, 1, 2   #kinds of events
+
+def scanEvents(s, idx = 0):
+    """ yields (START, name), (ATOM, value) and (END, None) events of first list starting at idx
+    name of list without name is None, nothing is kept so memory use does not depend on size of s """
+    match, decode = tokenizer(s, idx)
+    depth = 0
+    opened = False  #name of opened list was not read yet
     while True:
-        value, idx = parseItem(s, idx)
-        if value is None:
-            return S(name, items), idx
-        items.append(value)
+        r = match()
+        if r is None:
+            raise Exception('unexpected end of file')
+        t = r.lastindex
+        if t == 1:
+            if opened:
+                yield START, None
+            opened = True
+            depth += 1
+            continue
+        if t == 2:
+            if opened:
+                yield START, None
+                opened = False
+            yield END, None
+            depth -= 1
+            if depth == 0:
+                return
+            continue
+        value = r.group(t)
+        if decode:
+            value = value.decode()
+        if opened:
+            yield START, value
+            opened = False
+        else:
+            yield ATOM, value
+
+def events(path, root = None):
+    """ events of memory mapped file, see scanEvents
+    when root is given, file must be list with that name, it is checked before any event is yielded """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as b:
+            if b[:1] != b'(':
+                raise Exception('file must start with (')
+            if root is not None:
+                r = BTOKEN.match(b[:256], 1)    #copy of head, match of mapped buffer would keep it open
+                if r is None or r.lastindex < 3 or r.group(r.lastindex).decode() != root:
+                    raise Exception('file must start with (%s' % root)
+            yield from scanEvents(b)
+
+def collect(events, name):
+    """ S of list whose START event was read last, consumes events up to its END """
+    stack = []
+    items = []
+    for kind, value in events:
+        if kind == ATOM:
+            items.append(value)
+        elif kind == START:
+            stack.append((name, items))
+            name = value
+            items = []
+        else:
+            s = S(name, items)
+            if not stack:
+                return s
+            name, items = stack.pop()
+            items.append(s)
+    raise Exception('unexpected end of file')
+
+def skip(events):
+    """ consumes events up to END of list whose START event was read last """
+    depth = 1
+    for kind, value in events:
+        if kind == START:
+            depth += 1
+        elif kind == END:
+            depth -= 1
+            if depth == 0:
+                return
+    raise Exception('unexpected end of file')
 
 def distance(s):
     return round(float(s) * 1e6)
@@ -70,7 +197,9 @@ def nm(nm):
     return str(nm / 1e6)
 
 
-def load(path):
+def load(path, mapped = False):
+    if mapped:
+        return loadMapped(path)
     with open(path) as f:
         s = f.read()
         if s[0] != '(':
@@ -78,7 +207,17 @@ def load(path):
         r,idx = parseS(s,1)
         return r
 
+def loadMapped(path):
+    """ parses memory mapped file, only tokens which are kept are decoded """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as b:
+            if b[:1] != b'(':
+                raise Exception('file must start with (')
+            r,idx = parseS(b, 1)
+            return r
+
 def save(path, s):
     with open(path,'w') as f:
-        s.save(f, 0)
+        for c in s.chunks():
+            f.write(c)
 
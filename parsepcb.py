@@ -1,20 +1,40 @@
 import re
+import gc
 WHITESPACE = re.compile("[ \r\t\n]*")
 ITEM = re.compile("([^ \r\t\n([]*)[ \r\t\n]*[([]") 
 STRING = re.compile('"([^"]*)"')
 CHAR = re.compile("'(.)'")
 NUMBER = re.compile('(-?[\d.]+)(mil|mm)?')
 ITEMSSTART = re.compile('[ \r\t\n]*\(')
+TOKEN = re.compile('[ \r\t\n]*(?:'
+        '(?P<string>"([^"]*)")|'
+        "(?P<char>'(.)')|"
+        '(?P<number>(-?[\d.]+)(mil|mm)?)|'
+        '(?P<close>[)\]])|'
+        '(?P<comment>#([^\n]*))|'
+        '(?P<item>([^ \r\t\n([]*)[ \r\t\n]*([([]))|'
+        '(?P<end>\Z))')
+FLAGSEP = re.compile(',(?![^(]*\))')    #commas in thermal(0X,1S) do not separate flags
 
-class StringValue:
+class Immutable:
+    """ parsed values are shared by all attributes with same token, so they can not be changed """
+    __slots__ = ()
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+setField = object.__setattr__
+
+class StringValue(Immutable):
+    __slots__ = ('value',)
     def __init__(self, value):
-        self.value = value
+        setField(self, 'value', value)
     def save(self, f):
         f.write('"')
         f.write(self.value)
         f.write('"')
     def flags(self):
-        return set(self.value.split(','))
+        v = self.value
+        return set(FLAGSEP.split(v) if '(' in v else v.split(','))
     def array(self):
         return self.value.split(':')
     def pin(self):
@@ -25,9 +45,10 @@ class StringValue:
 def flags(f):
     return StringValue(','.join(f))
 
-class CharValue:
+class CharValue(Immutable):
+    __slots__ = ('value',)
     def __init__(self, value):
-        self.value = value
+        setField(self, 'value', value)
     def char(self):
         return self.value
     def save(self, f):
@@ -42,15 +63,17 @@ def nm(nm):
         return NumericValue(nm / 25400, "mil")
     return NumericValue(nm / 1e6, "mm")
 
-class NumericValue:
+class NumericValue(Immutable):
+    __slots__ = ('value', 'unit', 'dist')  #dist is distance in nm, computed on first use
     def __init__(self, value, unit = None):
         if isinstance(value, (int, float)):
-            self.value = value
+            setField(self, 'value', value)
         elif '.' in value:
-            self.value = float(value)
+            setField(self, 'value', float(value))
         else:
-            self.value = int(value)
-        self.unit = unit
+            setField(self, 'value', int(value))
+        setField(self, 'unit', unit)
+        setField(self, 'dist', None)
     def __str__(self):
         return str(self.value) + (self.unit if self.unit else '')
     def save(self, f):
@@ -61,6 +84,12 @@ class NumericValue:
         return self.value
     def distance(self):
         """ distance in nm """
+        d = self.dist
+        if d is None:
+            d = self.toDistance()
+            setField(self, 'dist', d)
+        return d
+    def toDistance(self):
         if self.unit == 'mil':
             v = round(self.value * 0.0254 * 1e6)
             if abs(round(v / 1e4) - v / 1e4) < 0.0254:    #it is in mils but should be in mm
@@ -105,8 +134,29 @@ class Item:
             f.write(('\t' * level) + ')')
         f.write('\n')
 
-        
+class ValueCache:
+    """ identical tokens of one file share one immutable value object, used by single scanItems call
+    at most maxSize tokens are interned, values of further new tokens are not kept """
+    def __init__(self, maxSize = 1 << 16):
+        self.values = {}    #token text -> value
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0   #misses not interned because cache was full
+    def add(self, key, value):
+        self.misses += 1
+        if len(self.values) < self.maxSize:
+            self.values[key] = value
+        else:
+            self.uncached += 1
+        return value
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.values), 'max_size': self.maxSize, 'hits': self.hits, 'misses': self.misses, 'uncached': self.uncached,
+            'hit_rate': self.hits / lookups if lookups else 0.0}
+
 def parseValue(s, idx):
+    """ value of recursive parser, it is not interned, only scanItems shares values through ValueCache """
     res = STRING.match(s, idx)
     if res:
         return StringValue(res.group(1)), res.end()
@@ -173,10 +223,87 @@ def parseItems(s, idx):
             return res, idx
         res.append(item)
 
-def load(path):
+#value of attribute token by name of its TOKEN group
+NEWVALUE = {
+    'number': lambda r: NumericValue(r.group(6), r.group(7)),
+    'string': lambda r: StringValue(r.group(2)),
+    'char': lambda r: CharValue(r.group(4)),
+}
+
+def scanItems(s, idx = 0, values = None):
+    """ same as parseItems but without recursion, all tokens are matched by single TOKEN regex
+    values is ValueCache of tokens, new one is used when it is not given """
+    if values is None:
+        values = ValueCache()
+    res = []
+    items = res     #children of currently open item
+    stack = []      #parents of items
+    attrs = None    #attributes of item being read
+    children = False    #attributes were closed, children may follow
+    token = TOKEN.scanner(s, idx).match
+    cached = values.values.get
+    hits = 0
+    enabled = gc.isenabled()
+    gc.disable()    #tree has no cycles, collector would only rescan it over and over
+    try:
+        while True:
+            r = token()
+            if not r:
+                idx = WHITESPACE.match(s, idx).end()
+                raise Exception("Syntax error near idx %s, %s" % (idx, s[idx:idx+30]))
+            idx = r.end()
+            kind = r.lastgroup
+            if attrs is not None:
+                if kind == 'close':
+                    attrs = None
+                    children = True
+                    continue
+                if kind not in NEWVALUE:
+                    raise Exception("Syntax error near idx %s, %s" % (r.start(kind), s[r.start(kind):r.start(kind)+30]))
+                key = r.group(kind)
+                v = cached(key)
+                if v is None:
+                    v = values.add(key, NEWVALUE[kind](r))
+                else:
+                    hits += 1
+                attrs.append(v)
+                continue
+            if children:
+                children = False
+                if kind == 'item' and r.group(12) == '' and r.group(13) == '(':
+                    stack.append(items)
+                    items[-1].children = items = []
+                    continue
+            if kind == 'item':
+                name = r.group(12)
+                if name == 'Hole':  #hole does not have attributes
+                    stack.append(items)
+                    items.append(Item(name, None, r.group(13) == '(', []))
+                    items = items[-1].children
+                else:
+                    attrs = []
+                    items.append(Item(name, attrs, r.group(13) == '(', None))
+            elif kind == 'close':
+                if not stack:
+                    return res, idx
+                items = stack.pop()
+            elif kind == 'comment':
+                items.append(Item('comment', [r.group(10)], False, None))
+            elif kind == 'end':
+                if stack:
+                    raise Exception("Unexpected end of file")
+                return res, idx
+            else:
+                raise Exception("Syntax error near idx %s, %s" % (r.start(kind), s[r.start(kind):r.start(kind)+30]))
+    finally:
+        values.hits += hits
+        if enabled:
+            gc.enable()
+
+def load(path, values = None):
     with open(path) as f:
         s = f.read()
-        r,idx = parseItems(s, 0)
+        r,idx = scanItems(s, 0, values)
         return r
 
 
@@ -0,0 +1,43 @@
+#Sequential access to lines of schematic files shared by the parsers.
+
+class LineCursor:
+    """ reads lines one by one from list, text or open file without copying them
+    lines taken by next can be returned by pushback """
+    def __init__(self, source):
+        if isinstance(source, str):
+            source = source.split('\n')
+        self.source = iter(source)
+        self.pending = []   #lines returned by pushback, last one is next
+
+    def next(self):
+        if self.pending:
+            return self.pending.pop()
+        for line in self.source:
+            if line.endswith('\n'): #lines of file keep their end
+                return line[:-1]
+            return line
+        raise IndexError('no more lines')
+
+    def peek(self):
+        """ next line without consuming it, None at end """
+        if not self.pending:
+            try:
+                self.pending.append(self.next())
+            except IndexError:
+                return None
+        return self.pending[-1]
+
+    def pushback(self, line):
+        self.pending.append(line)
+
+    def __bool__(self):
+        return self.peek() is not None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self.next()
+        except IndexError:
+            raise StopIteration
@@ -1,29 +1,31 @@
 import re
+from cursor import LineCursor
+
+FIELD = re.compile(r'"([^"]*(?:"(?! |\Z)[^"]*)*)"(?= |\Z)|([^ ]+)')   #quoted field ends by quote followed by space
 
 def loadFields(s):
-    fields = s.split(' ')
-    r = []
-    while fields:
-        f = fields.pop(0)
-        if f:
-            if f[0] == '"':
-                f = f[1:]
-                if f and f[-1] == '"':
-                    f = f[0:-1]
-                else:
-                    p = fields.pop(0)
-                    while p == "" or p[-1] != '"':
-                        f += ' ' + p
-                        p = fields.pop(0)
-                    f += ' ' + p[0:-1]
-            r.append(f)
+    """ splits line on spaces, quoted fields may contain spaces or be empty """
+    if '"' not in s:
+        return list(filter(None, s.split(' ')))
+    parts = s.split('"') #quoted fields are on odd positions if no field contains quote
+    last = len(parts) - 2
+    if last % 2 == 0:
+        return [u or q for q, u in FIELD.findall(s)]
+    r = list(filter(None, parts[0].split(' ')))
+    for i in range(1, last + 1, 2):
+        before = parts[i - 1]
+        after = parts[i + 1]
+        if not (before.endswith(' ') or (i == 1 and not before)) or not (after.startswith(' ') or (i == last and not after)):
+            return [u or q for q, u in FIELD.findall(s)]
+        r.append(parts[i])
+        r += filter(None, after.split(' '))
     return r
 
 def saveFields(*fields):
     r = []
     for f in fields:
         f = str(f)
-        if ' ' in f and f[0] != '"':
+        if not f or (' ' in f and f[0] != '"'):    #would be lost or split by loadFields
             r.append('"' + f + '"')
         else:
             r.append(f)
@@ -49,9 +51,9 @@ class Layers:
     def parse(self, attributes, lines):
         self.nn = int(attributes[1])    #documentation does not say what this is
         self.mm = int(attributes[2])
-        if lines[0] != 'EELAYER END':
+        if lines.peek() != 'EELAYER END':
             raise "Don't know what to do with layers"
-        lines.pop(0)
+        lines.next()
     def save(self):
         return ['EELAYER %s %s' % (self.nn, self.mm), 'EELAYER END']
 
@@ -61,11 +63,11 @@ class Page:
         self.dimx = int(attributes[2])
         self.dimy = int(attributes[3])
         self.fields = {}
-        line = lines.pop(0)
+        line = lines.next()
         while line != '$EndDescr':
             k, v = line.split(' ', 1)
             self.fields[k] = v
-            line = lines.pop(0)
+            line = lines.next()
     def save(self):
         r =  ['$Descr %s %s %s' % (self.format, self.dimx, self.dimy)]
         for k, v in self.fields.items():
@@ -99,13 +101,13 @@ class Text:
         self.orientation = int(attributes[4])
         self.size = int(attributes[5])
         self.shape = attributes[6]
-        self.text = lines.pop(0)
+        self.text = lines.next()
     def save(self):
         return [saveFields('Text', self.type, self.x, self.y, self.orientation, self.size, self.shape), self.text]
 
 class Componnent:
     def parse(self, attributes, lines):
-        f = loadFields(lines.pop(0))
+        f = loadFields(lines.next())
         self.fields = []
         while f[0] != '$EndComp':
             if f[0] == 'L':
@@ -126,7 +128,7 @@ class Componnent:
                 if len(f) == 4:
                     f[0] = f[0].strip()
                     self.orientation = f
-            f = loadFields(lines.pop(0))
+            f = loadFields(lines.next())
     def save(self):
         r =  ['$Comp']
         r.append(saveFields('L', self.name, self.ref))
@@ -142,7 +144,7 @@ class Componnent:
 class Wire:
     def parse(self, attributes, lines):
         self.type = attributes[1]
-        attributes = loadFields(lines.pop(0))
+        attributes = loadFields(lines.next())
         self.x1 = int(attributes[0])
         self.y1 = int(attributes[1])
         self.x2 = int(attributes[2])
@@ -158,9 +160,11 @@ class Connection:
         return [saveFields('Connection', '~', self.x, self.y)]
 
 def loadItems(lines, end = None):
+    if not isinstance(lines, LineCursor):
+        lines = LineCursor(lines)
     items = []
     while lines:
-        line = lines.pop(0)
+        line = lines.next()
         if not line:
             continue
         attributes = loadFields(line)
@@ -201,8 +205,7 @@ def saveItems(items):
 
 def load(path):
     with open(path) as f:
-        lines = f.read().split('\n')
-        return loadItems(lines)
+        return loadItems(LineCursor(f))
 
 def save(path, items):
     lines = saveItems(items)
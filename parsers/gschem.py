@@ -1,4 +1,5 @@
 import re
+from cursor import LineCursor
 WHITESPACE = re.compile("[ \r\t\n]*")
 NAME = re.compile("[^ \r\t\n)]+") 
 STRING = re.compile('"([^"]*)"')
@@ -43,9 +44,9 @@ class Text:
         self.angle = int(attributes[6])
         self.alignment = int(attributes[7])
         nl = int(attributes[8])
-        self.text = lines.pop(0)
+        self.text = lines.next()
         for i in range(nl - 1):
-            self.text += '\n' + lines.pop(0)
+            self.text += '\n' + lines.next()
     def save(self):
         lines = self.text.split('\n')
         r =  [' '.join([
@@ -141,9 +142,11 @@ class Box:
 
 
 def loadItems(lines, end = None):
+    if not isinstance(lines, LineCursor):
+        lines = LineCursor(lines)
     items = []
     while lines:
-        line = lines.pop(0)
+        line = lines.next()
         if not line:
             continue
         attributes = line[2:].split(' ')
@@ -187,8 +190,7 @@ def saveItems(items):
 
 def load(path):
     with open(path) as f:
-        lines = f.read().split('\n')
-        return loadItems(lines)
+        return loadItems(LineCursor(f))
 
 def save(path, items):
     lines = saveItems(items)
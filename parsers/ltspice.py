@@ -1,4 +1,5 @@
 #Python Library to parse ltspice's .asc schematic files.
+from cursor import LineCursor
 
 def warn(msg):
     print("[WARN]LTSpice:", msg)
@@ -44,11 +45,11 @@ class Component:
         self.attributes = {}
         self.window = []
         
-        while True:
-            line = lines.pop(0)
+        while lines:
+            line = lines.next()
             attrs = line.split(' ')
             if attrs[0] in objTypes.keys():
-                lines.insert(0, line)
+                lines.pushback(line)
                 break
             elif attrs[0] == 'SYMATTR':
                 self.attributes[attrs[1]] = ' '.join(attrs[2:])
@@ -93,9 +94,11 @@ objTypes = {
 }
 
 def loadItems(lines, end = None):
+    if not isinstance(lines, LineCursor):
+        lines = LineCursor(lines)
     items = []
     while lines:
-        line = lines.pop(0)
+        line = lines.next()
         if not line:
             continue
         attributes = line.split(' ')
@@ -123,8 +126,7 @@ def saveItems(items):
 
 def load(path):
     with open(path, errors='ignore') as f:
-        lines = f.read().split('\n')
-        return loadItems(lines)
+        return loadItems(LineCursor(f))
 
 def save(path, items):
     lines = saveItems(items)
@@ -1,4 +1,9 @@
 from parsepcb import Item, parseValue, nm, NumericValue, CharValue, StringValue, load, save, flags
+try:
+    import numpy
+except ImportError:  #only needed for columnar mode
+    numpy = None
+from math import hypot
 
 class Style:
     def __init__(self, string):
@@ -11,7 +16,10 @@ class Style:
     def __str__(self):
         return self.name + ',' + str(nm(self.thick)) + ',' + str(nm(self.diameter)) + ',' + str(nm(self.drill)) + ',' + str(nm(self.spacing))
 
+#classes of which boards contain many instances use __slots__ to save memory
+
 class SymbolLine:
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'thick', 'element')
     def __init__(self, item, element):
         self.x1 = item.attributes[0].distance()
         self.y1 = item.attributes[1].distance()
@@ -23,6 +31,7 @@ class SymbolLine:
         return Item('ElementLine' if self.element else 'SymbolLine', [nm(self.x1), nm(self.y1), nm(self.x2), nm(self.y2), nm(self.thick)])
 
 class ElementArc:
+    __slots__ = ('x', 'y', 'width', 'height', 'startAngle', 'angle', 'thick')
     def __init__(self, item):
         self.x = item.attributes[0].distance()
         self.y = item.attributes[1].distance()
@@ -35,6 +44,7 @@ class ElementArc:
         return Item('ElementArc', [nm(self.x), nm(self.y), nm(self.width), nm(self.height), NumericValue(self.startAngle), NumericValue(self.angle), nm(self.thick)])
 
 class Pin:
+    __slots__ = ('x', 'y', 'dimater', 'spacing', 'mask', 'drill', 'name', 'number', 'flags')
     def __init__(self, item):
         self.x = item.attributes[0].distance()
         self.y = item.attributes[1].distance()
@@ -49,6 +59,7 @@ class Pin:
         return Item('Pin', [nm(self.x), nm(self.y), nm(self.dimater), nm(self.spacing), nm(self.mask), nm(self.drill), StringValue(self.name), StringValue(self.number), flags(self.flags)])
 
 class Pad:
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'thick', 'spacing', 'mask', 'name', 'number', 'flags')
     def __init__(self, item):
         self.x1 = item.attributes[0].distance()
         self.y1 = item.attributes[1].distance()
@@ -76,6 +87,7 @@ class Symbol:
         return Item("Symbol", [CharValue(self.char), nm(self.delta)], False, [l.itemize() for l in self.lines])
 
 class Via:
+    __slots__ = ('x', 'y', 'diameter', 'spacing', 'mask', 'drill', 'burrFrom', 'burrTo', 'name', 'flags')
     def __init__(self, item):
         a = item.attributes;
         self.x = a[0].distance()
@@ -85,20 +97,37 @@ class Via:
         self.mask = a[4].distance()
         self.drill = a[5].distance()
         if len(a) == 10: #burried
-            self.burrFrom = a[6]
-            self.burrTo = a[7]
-            self.name = a[8]
+            self.burrFrom = a[6].num()
+            self.burrTo = a[7].num()
+            self.name = a[8].str()
             self.flags = a[9].flags()
         else:
             self.burrFrom = None
             self.burrTo = None
-            self.name = a[6]
+            self.name = a[6].str()
             self.flags = a[7].flags()
     def itemize(self):
-        return Item('Via', [nm(self.x), nm(self.y), nm(self.diameter), nm(self.spacing), nm(self.mask), nm(self.drill)] + ([self.burrFrom, self.burrTo] if self.burrTo else [])  + [self.name, flags(self.flags)])
+        burried = [NumericValue(self.burrFrom), NumericValue(self.burrTo)] if self.burrTo is not None else []
+        return Item('Via', [nm(self.x), nm(self.y), nm(self.diameter), nm(self.spacing), nm(self.mask), nm(self.drill)] + burried + [StringValue(self.name), flags(self.flags)])
+
+class Lazy:
+    """ attribute of lazy object which is built by its materialize() on first access
+    materialize stores attributes in instance dict, which then hides this descriptor """
+    def __set_name__(self, owner, name):
+        self.name = name
+    def __get__(self, obj, owner):
+        if obj is None:
+            return self
+        obj.materialize()
+        return obj.__dict__[self.name]
 
 class Element:
-    def __init__(self, item):
+    attributes = Lazy()
+    lines = Lazy()
+    arcs = Lazy()
+    pins = Lazy()
+    pads = Lazy()
+    def __init__(self, item, lazy = False):
         a = item.attributes
         self.flags = a[0].flags()
         self.description = a[1].str()
@@ -111,7 +140,14 @@ class Element:
         self.tdir = a[8].num()
         self.tscale = a[9].num()
         self.tflags = a[10].flags()
+        self.item = item
+        if not lazy:
+            self.materialize()
 
+    def materialize(self):
+        """ builds children from item """
+        item = self.item
+        del self.item
         self.attributes = {}
         self.lines = []
         self.arcs = []
@@ -139,6 +175,7 @@ class Element:
             NumericValue(self.tdir), NumericValue(self.tscale), flags(self.flags)], False, items + [l.itemize() for l in (self.lines + self.arcs + self.pins + self.pads)])
 
 class Line:
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'thick', 'spacing', 'flags')
     def __init__(self, item):
         self.x1 = item.attributes[0].distance()
         self.y1 = item.attributes[1].distance()
@@ -151,6 +188,7 @@ class Line:
         return Item('Line', [nm(self.x1), nm(self.y1), nm(self.x2), nm(self.y2), nm(self.thick), nm(self.spacing), flags(self.flags)])
 
 class Arc:
+    __slots__ = ('x', 'y', 'width', 'height', 'thick', 'spacing', 'startAngle', 'angle', 'flags')
     def __init__(self, item):
         self.x = item.attributes[0].distance()
         self.y = item.attributes[1].distance()
@@ -202,12 +240,144 @@ class Polygon:
     def itemize(self):
         return Item('Polygon', [flags(self.flags)], True, [Item('', [nm(p[0]), nm(p[1])]) for p in self.points] + [h.itemize() for h in self.holes])
 
+def column(i):
+    """ property of view reading column i of its columns """
+    def get(self):
+        return int(self.columns.data[self.index, i])
+    def set(self, v):
+        self.columns.data[self.index, i] = v
+    return property(get, set)
+
+def other(name):
+    """ property of view reading non numeric attribute from list of its columns """
+    def get(self):
+        return self.columns.other[name][self.index]
+    def set(self, v):
+        self.columns.other[name][self.index] = v
+    return property(get, set)
+
+class Columns:
+    """ items of one type stored column wise, distances are in int64 array data (nm), one row per item
+    flags column holds index to list of distinct flag sets, other attributes are kept in lists
+    items are accessed by views of given class which behave like model objects """
+    def __init__(self, view, rows, flags, flagSets, other = None):
+        if numpy is None:
+            raise Exception('columnar mode requires numpy')
+        self.view = view
+        self.data = numpy.array(rows, dtype = numpy.int64).reshape(-1, len(view.COLUMNS))
+        self.flags = numpy.array(flags, dtype = numpy.int32)
+        self.flagSets = flagSets
+        self.other = other or {}
+    def __len__(self):
+        return len(self.data)
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.view(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('index out of range')
+        return self.view(self, i)
+    def __iter__(self):
+        view = self.view
+        return (view(self, i) for i in range(len(self.data)))
+    def getFlags(self, i):
+        return set(self.flagSets[self.flags[i]])   #copy, assign flags to change them
+    def setFlags(self, i, f):
+        f = frozenset(f)
+        if f not in self.flagSets:
+            self.flagSets.append(f)
+        self.flags[i] = self.flagSets.index(f)
+    def points(self):
+        """ x and y columns of all points of items """
+        return [self.data[:, self.view.COLUMNS.index(x)] for x in self.view.XS], [self.data[:, self.view.COLUMNS.index(y)] for y in self.view.YS]
+    def bbox(self):
+        """ (x1, y1, x2, y2) of points of items, None if there are no items """
+        if not len(self):
+            return None
+        xs, ys = self.points()
+        return (int(min(x.min() for x in xs)), int(min(y.min() for y in ys)), int(max(x.max() for x in xs)), int(max(y.max() for y in ys)))
+    def translate(self, dx, dy):
+        for x in self.view.XS:
+            self.data[:, self.view.COLUMNS.index(x)] += dx
+        for y in self.view.YS:
+            self.data[:, self.view.COLUMNS.index(y)] += dy
+
+class LineView:
+    """ Line stored in LineColumns """
+    __slots__ = ('columns', 'index')
+    COLUMNS = ('x1', 'y1', 'x2', 'y2', 'thick', 'spacing')
+    XS = ('x1', 'x2')
+    YS = ('y1', 'y2')
+    def __init__(self, columns, index):
+        self.columns = columns
+        self.index = index
+    flags = property(lambda self: self.columns.getFlags(self.index), lambda self, f: self.columns.setFlags(self.index, f))
+    itemize = Line.itemize
+for i, name in enumerate(LineView.COLUMNS):
+    setattr(LineView, name, column(i))
+
+class LineColumns(Columns):
+    def __init__(self, items):
+        rows = []
+        flags = []
+        codes = {}  #flags string -> index to flag sets
+        for item in items:
+            a = item.attributes
+            rows += [v.distance() for v in a[:6]]
+            flags.append(codes.setdefault(a[6].value, len(codes)))
+        Columns.__init__(self, LineView, rows, flags, [frozenset(StringValue(f).flags()) for f in codes])
+    def lengths(self):
+        d = self.data
+        return numpy.hypot(d[:, 2] - d[:, 0], d[:, 3] - d[:, 1])
+    def length(self):
+        """ total length of lines in nm """
+        return float(self.lengths().sum())
+
+class ViaView:
+    """ Via stored in ViaColumns """
+    __slots__ = ('columns', 'index')
+    COLUMNS = ('x', 'y', 'diameter', 'spacing', 'mask', 'drill')
+    XS = ('x',)
+    YS = ('y',)
+    def __init__(self, columns, index):
+        self.columns = columns
+        self.index = index
+    flags = property(lambda self: self.columns.getFlags(self.index), lambda self, f: self.columns.setFlags(self.index, f))
+    burrFrom = other('burrFrom')
+    burrTo = other('burrTo')
+    name = other('name')
+    itemize = Via.itemize
+for i, name in enumerate(ViaView.COLUMNS):
+    setattr(ViaView, name, column(i))
+
+class ViaColumns(Columns):
+    def __init__(self, items):
+        vias = [Via(item) for item in items]    #few compared to lines, reuses parsing of burried vias
+        codes = {}
+        flags = [codes.setdefault(frozenset(v.flags), len(codes)) for v in vias]
+        Columns.__init__(self, ViaView, [[getattr(v, c) for c in ViaView.COLUMNS] for v in vias], flags, list(codes),
+            {name: [getattr(v, name) for v in vias] for name in ('burrFrom', 'burrTo', 'name')})
+
 class Layer:
-    def __init__(self, item):
+    lines = Lazy()
+    texts = Lazy()
+    arcs = Lazy()
+    polygons = Lazy()
+    def __init__(self, item, columnar = False, lazy = False):
         self.number = item.attributes[0].num()
         self.name = item.attributes[1].str()
         self.flags = item.attributes[2].flags()
+        self.item = item
+        self.columnar = columnar
+        if not lazy:
+            self.materialize()
 
+    def materialize(self):
+        """ builds children from item """
+        item = self.item
+        columnar = self.columnar
+        del self.item
         self.lines = []
         self.texts = []
         self.arcs = []
@@ -215,7 +385,7 @@ class Layer:
     
         for c in item.children:
             if c.name == "Line":
-                self.lines.append(Line(c))
+                self.lines.append(c if columnar else Line(c))
             elif c.name == "Text":
                 self.texts.append(Text(c))
             elif c.name == "Arc":
@@ -224,8 +394,10 @@ class Layer:
                 self.polygons.append(Polygon(c))
             else:
                 raise Exception("unknown item %s" % c.name)
+        if columnar:
+            self.lines = LineColumns(self.lines)
     def itemize(self):
-        return Item('Layer', [NumericValue(self.number), StringValue(self.name), flags(self.flags)], True, [g.itemize() for g in (self.lines + self.texts + self.arcs + self.polygons)])
+        return Item('Layer', [NumericValue(self.number), StringValue(self.name), flags(self.flags)], True, [g.itemize() for items in (self.lines, self.texts, self.arcs, self.polygons) for g in items])
 
 class Connect:
     def __init__(self, item):
@@ -271,7 +443,9 @@ class Rat:
         return Item('Rat', [nm(self.x1), nm(self.y1), NumericValue(self.g1), nm(self.x2), nm(self.y2), NumericValue(self.g2), flags(self.flags)])
 
 class Pcb:
-    def __init__(self, items):
+    """ with columnar = True lines of layers and vias are stored in numpy arrays, see Columns
+    with lazy = True children of elements and layers are built on first access, see Lazy """
+    def __init__(self, items, columnar = False, lazy = False):
         if isinstance(items, str):
             items = load(items)
         self.comments = []
@@ -321,17 +495,69 @@ class Pcb:
             elif item.name == "Attribute":
                 self.attributes[item.attributes[0].str()] = item.attributes[1].str()
             elif item.name == "Via":
-                self.vias.append(Via(item))
+                self.vias.append(item if columnar else Via(item))
             elif item.name == "Element":
-                self.elements.append(Element(item))
+                self.elements.append(Element(item, lazy))
             elif item.name == "Layer":
-                self.layers.append(Layer(item))
+                self.layers.append(Layer(item, columnar, lazy))
             elif item.name == "NetList":
                 self.netlist = Netlist(item)
             elif item.name == "Rat":
                 self.rats.append(Rat(item))
             else:
                 raise Exception("unknown item %s" % item.name)
+        if columnar:
+            self.vias = ViaColumns(self.vias)
+
+    def bbox(self):
+        """ (x1, y1, x2, y2) of line ends and via centres, None if there are none """
+        xs = []
+        ys = []
+        for items, view in [(self.vias, ViaView)] + [(l.lines, LineView) for l in self.layers]:
+            if isinstance(items, Columns):
+                b = items.bbox()
+                if b:
+                    xs += [b[0], b[2]]
+                    ys += [b[1], b[3]]
+            else:
+                for i in items:
+                    xs.extend(getattr(i, x) for x in view.XS)
+                    ys.extend(getattr(i, y) for y in view.YS)
+        return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+    def copperLength(self):
+        """ total length of lines on copper layers in nm """
+        total = 0.0
+        for l in self.layers:
+            if 'copper' in l.flags:
+                if isinstance(l.lines, Columns):
+                    total += l.lines.length()
+                else:
+                    total += sum(hypot(line.x2 - line.x1, line.y2 - line.y1) for line in l.lines)
+        return total
+
+    def translate(self, dx, dy):
+        """ moves everything on board by dx, dy """
+        def move(objects, xs, ys):
+            if isinstance(objects, Columns):
+                objects.translate(dx, dy)
+                return
+            for o in objects:
+                for x in xs:
+                    setattr(o, x, getattr(o, x) + dx)
+                for y in ys:
+                    setattr(o, y, getattr(o, y) + dy)
+        move(self.vias, ['x'], ['y'])
+        move(self.elements, ['x'], ['y'])   #element parts are relative to it
+        move(self.rats, ['x1', 'x2'], ['y1', 'y2'])
+        for l in self.layers:
+            move(l.lines, ['x1', 'x2'], ['y1', 'y2'])
+            move(l.arcs, ['x'], ['y'])
+            move(l.texts, ['x'], ['y'])
+            for p in l.polygons:
+                p.points = [(x + dx, y + dy) for x, y in p.points]
+                for h in p.holes:
+                    h.points = [(x + dx, y + dy) for x, y in h.points]
 
     def itemize(self):
         items = []
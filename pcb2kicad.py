@@ -1,7 +1,16 @@
-from pcb import Pcb
+from pcb import Pcb, Columns
 from kicad import Kicad, NetClass, Setup, Via, Segment, Line, Text, Effects, Arc, Zone, Module, Pad
 from math import sin, cos, pi
-import sys
+from operator import attrgetter
+import re, sys, argparse
+try:
+    import numpy
+except ImportError:  #only vectorized geometry needs it
+    numpy = None
+import parsepcb, pcb, kicad, parsekicad, cache, stats, connectivity
+from stats import NOSTATS, countItems
+
+VERSION = cache.version(parsepcb, pcb, parsekicad, kicad, connectivity, sys.modules[__name__])
 
 
 def kicadLine(line, layer):
@@ -12,16 +21,114 @@ def kicadLine(line, layer):
     s.layer = layer
     return s
 
-def kicadArc(arc, layer):
+def kicadArc(arc, layer, end):
     a = Arc()
     a.start = (arc.x, arc.y)
-    r = arc.width #pcb probably uses just width
-    a.end = (arc.x - r * cos(arc.startAngle / 180 * pi), arc.y + r * sin(arc.startAngle / 180 * pi))
+    a.end = end
     a.angle = -arc.angle
     a.layer = layer
     a.width = arc.thick
     return a
 
+#geometry of whole layer or all elements is computed at once by scalar or vectorized kernel
+
+LINE = ('x1', 'y1', 'x2', 'y2', 'thick')
+ARC = ('x', 'y', 'width', 'startAngle')
+
+def lineGeometry(lines):
+    """ (x1, y1, x2, y2, width) of each line """
+    return list(map(attrgetter(*LINE), lines))
+
+def arcEnds(arcs):
+    """ end point of each arc, pcb probably uses just width as radius """
+    return [(a.x - a.width * cos(a.startAngle / 180 * pi), a.y + a.width * sin(a.startAngle / 180 * pi)) for a in arcs]
+
+def padGeometry(pads):
+    """ (x, y, width, height) of kicad pad for each pcb pad """
+    return [((p.x1 + p.x2) / 2, (p.y1 + p.y2) / 2, abs(p.x1 - p.x2) + p.thick, abs(p.y1 - p.y2) + p.thick) for p in pads]
+
+def columns(objects, names):
+    """ attributes of objects as numpy array with row for each object, columnar storage is used directly """
+    if isinstance(objects, Columns) and all(n in objects.view.COLUMNS for n in names):
+        return objects.data[:, [objects.view.COLUMNS.index(n) for n in names]]
+    return numpy.array(list(map(attrgetter(*names), objects)), dtype = numpy.float64).reshape(-1, len(names))
+
+def lineGeometryVectorized(lines):
+    return columns(lines, LINE).tolist()
+
+def arcEndsVectorized(arcs):
+    a = columns(arcs, ARC)
+    angle = a[:, 3] / 180 * numpy.pi
+    return numpy.column_stack((a[:, 0] - a[:, 2] * numpy.cos(angle), a[:, 1] + a[:, 2] * numpy.sin(angle))).tolist()
+
+def padGeometryVectorized(pads):
+    a = columns(pads, LINE)
+    return numpy.column_stack(((a[:, 0] + a[:, 2]) / 2, (a[:, 1] + a[:, 3]) / 2, numpy.abs(a[:, 0] - a[:, 2]) + a[:, 4], numpy.abs(a[:, 1] - a[:, 3]) + a[:, 4])).tolist()
+
+KERNELS = {
+    'lines': (lineGeometry, lineGeometryVectorized),
+    'arcs': (arcEnds, arcEndsVectorized),
+    'pads': (padGeometry, padGeometryVectorized),
+}
+
+def geometry(kernel, objects, vectorized = None):
+    """ runs scalar or numpy version of kernel, by default numpy is used only for columnar storage
+    as building arrays from objects costs more than the arithmetic it saves """
+    if vectorized is None:
+        vectorized = isinstance(objects, Columns)
+    return KERNELS[kernel][vectorized](objects)
+
+def point(p):
+    """ exact integer key of point """
+    return (round(p[0]), round(p[1]))
+
+def mergeSegments(segments, fixed = ()):
+    """ joins collinear touching segments of same width, layer and net, returns remaining segments
+    segments are joined only at points where no other segment of the layer ends and which are not inside copper
+    of fixed (shape, layers) of pads and vias, see connectivity.copper, so copper and connectivity stay the same
+    kicad connects segment to pad or via only by its end """
+    ends = {}   #(layer, point) -> indices of segments ending there
+    parts = []  #[start, end] of each segment, None for segments joined to other one
+    for i, s in enumerate(segments):
+        parts.append([s.start, s.end])
+        ends.setdefault((s.layer, point(s.start)), []).append(i)
+        ends.setdefault((s.layer, point(s.end)), []).append(i)
+    shapes = [(connectivity.bbox(shape), shape, layers) for shape, layers in fixed]
+    grid = connectivity.Grid(connectivity.cellSize([b for b, shape, layers in shapes]))
+    for i, (b, shape, layers) in enumerate(shapes):
+        grid.add(i, b)
+    def inCopper(layer, p):
+        x, y = p
+        for i in grid.near((x, y, x, y)):
+            b, shape, layers = shapes[i]
+            if layer in layers and connectivity.touch(('c', x, y, x, y, 0), shape):
+                return True
+        return False
+    for (layer, p), at in ends.items():
+        if len(at) != 2:
+            continue
+        i, j = at
+        a, b = segments[i], segments[j]
+        if i == j or a.width != b.width or getattr(a, 'net', None) != getattr(b, 'net', None):
+            continue
+        o1 = parts[i][1] if point(parts[i][0]) == p else parts[i][0]
+        o2 = parts[j][1] if point(parts[j][0]) == p else parts[j][0]
+        (x1, y1), (x2, y2) = point(o1), point(o2)
+        ux, uy = p[0] - x1, p[1] - y1
+        vx, vy = x2 - p[0], y2 - p[1]
+        if ux * vy - uy * vx != 0 or ux * vx + uy * vy <= 0 or inCopper(layer, p):  #not collinear, turns back or joins at pad or via
+            continue
+        parts[i] = [o1, o2]
+        parts[j] = None
+        other = ends[(layer, (x2, y2))]
+        other[other.index(j)] = i
+    merged = []
+    for s, part in zip(segments, parts):
+        if part is not None:
+            s.start, s.end = part
+            merged.append(s)
+    return merged
+
 def kicadText(text, x,y, dir, scale, layer, typ = None):
     t = Text()
     t.layer = layer
@@ -57,19 +164,16 @@ def getLayerName(l): #TODO use groups and generate layer map?
     return name
 
 
-def pcb2kicad(pcb):
-    kicad = Kicad()
-    kicad.version = '20171130'
-    kicad.host = ['pcbnew', '5.0.0']
-
-    #TODO thermal parameter in zones
-
-    kicad.setup = Setup()
+def kicadSettings(kicad, pcb):
+    """ design rules and net classes of board, setup is kept if kicad has it """
+    if getattr(kicad, 'setup', None) is None:
+        kicad.setup = Setup()
     kicad.setup.trace_min = pcb.minWidth
     kicad.setup.via_min_drill = pcb.minDrill
     kicad.setup.via_min_size = pcb.minWidth + pcb.minRing
     #TODO mask settings?
 
+    kicad.classes = []
     for s in pcb.styles:
         c = NetClass()
         c.name = s.name
@@ -80,119 +184,293 @@ def pcb2kicad(pcb):
         c.via_drill = s.drill
         kicad.classes.append(c)
 
+def netConnections(netlist):
+    """ (refdes, pin number) -> (number, name) of its net, nets are numbered from 1 in order of netlist """
+    r = {}
+    for i, n in enumerate(netlist.nets, 1):
+        for c in n.connects:
+            r[(c.part, c.pin)] = (i, n.name)
+    return r
+
+THERMAL = re.compile(r'(\d+)(?:-(\d+))?')
+
+def thermalLayers(flags, names):
+    """ kicad layers of thermal flag of pin or via, e.g. thermal(0X,2-3S), names are kicad names of copper layers by index from 0 """
+    r = []
+    for f in flags:
+        if f.startswith('thermal(') and f.endswith(')'):
+            for part in f[len('thermal('):-1].split(','):
+                m = THERMAL.match(part)
+                if m:
+                    first = int(m.group(1))
+                    r += [names[i] for i in range(first, int(m.group(2) or first) + 1) if i in names]
+    return r
+
+def zonePoints(pcb, kicad):
+    """ (x, y, net, copper layers, thermal layers) of pads, pins and vias with net, see connectivity.zoneNets
+    modules and vias of kicad are in same order as elements and vias of pcb """
+    names = {l.number - 1: getLayerName(l) for l in pcb.layers if 'copper' in l.flags}
+    copper = sorted(set(names.values()))
+    points = []
+    for e, m in zip(pcb.elements, kicad.modules):
+        for k, p in enumerate(m.pads):
+            net = getattr(p, 'net', None)
+            if net is None or p.t == 'np_thru_hole':
+                continue
+            x, y = m.at[0] + p.at[0], m.at[1] + p.at[1]
+            if k < len(e.pads):
+                points.append((x, y, net, p.layers[:1], []))
+            else:
+                points.append((x, y, net, copper, thermalLayers(e.pins[k - len(e.pads)].flags, names)))
+    for pv, v in zip(pcb.vias, kicad.vias):
+        if getattr(v, 'net', None) in kicad.nets:
+            points.append((v.at[0], v.at[1], (v.net, kicad.nets[v.net]), copper, thermalLayers(pv.flags, names)))
+    return points
+
+def kicadVia(pv):
+    v = Via()
+    v.at = (pv.x, pv.y)
+    v.size = pv.diameter
+    v.drill = pv.drill
+    v.layers = [ 'F.Cu' , 'B.Cu'] #TODO burried
+    return v
+
+def kicadModule(e, padGeometries, arcEnds):
+    """ module of element, geometry of its pads and arcs is taken from iterators over results of geometry """
+    m = Module()
+    m.name = e.description
+    side = 'B' if 'onsolder' in e.flags else 'F'
+    m.layer = side + '.Cu'
+    m.at = (e.x, e.y)
+    m.texts.append(kicadText(e.name, e.textx, e.texty, e.tdir, e.tscale, side + '.SilkS', 'reference'))
+    m.texts.append(kicadText(e.value, 0, 0, e.tdir, e.tscale, side + '.Fab', 'value'))
+    m.texts.append(kicadText('%R', 0, 0, e.tdir, e.tscale, side + '.Fab', 'user'))
+    for pad in e.pads:
+        p = Pad()
+        x, y, w, h = next(padGeometries)
+        p.at = (x, y)
+        p.size = (w, h)
+        pside = 'B' if 'onsolder' in pad.flags else 'F'
+        p.layers = [pside  + '.Cu', pside + '.Mask']
+        if not 'nopaste' in pad.flags:
+            p.layers.append(pside + '.Paste')
+        p.name = pad.number
+        p.t = 'smd'
+        p.shape = 'rect' if 'square' in pad.flags else 'oval'
+        m.pads.append(p)
+    for pin in e.pins:
+        p = Pad()
+        p.at = (pin.x, pin.y)
+        p.size = (pin.dimater, pin.dimater)
+        p.drill = pin.drill
+        p.layers = ['*.Cu', '*.Mask']
+        p.name = pin.number
+        p.t = 'np_thru_hole' if 'hole' in pin.flags else 'thru_hole'
+        p.shape = 'rect' if 'square' in pin.flags else 'circle'
+        m.pads.append(p)
+    for line in e.lines:
+        m.lines.append(kicadLine(line, side + '.SilkS'))
+        m.lines.append(kicadLine(line, side + '.Fab'))  #TODO optional?
+    for arc in e.arcs:
+        end = tuple(next(arcEnds))
+        m.arcs.append(kicadArc(arc, side + '.SilkS', end))
+        m.arcs.append(kicadArc(arc, side + '.Fab', end))  #TODO optional?
+    return m
+
+#elements with same footprint share geometry of their modules (flyweight), only position, texts and pad nets are per element
+
+def footprintKey(e):
+    """ everything kicadModule reads from element except its position and texts, elements with same key get same geometry """
+    return (e.description, 'onsolder' in e.flags, e.tdir, e.tscale,
+        tuple((p.x1, p.y1, p.x2, p.y2, p.thick, p.number, 'onsolder' in p.flags, 'nopaste' in p.flags, 'square' in p.flags) for p in e.pads),
+        tuple((p.x, p.y, p.dimater, p.drill, p.number, 'hole' in p.flags, 'square' in p.flags) for p in e.pins),
+        tuple(map(attrgetter(*LINE), e.lines)),
+        tuple((a.x, a.y, a.width, a.startAngle, a.angle, a.thick) for a in e.arcs))
+
+def footprintModule(template, e):
+    """ module of element sharing pads, lines, arcs and user text with template module of same footprint
+    module has own lists, so objects can be added to it or removed, shared pad is copied before it is changed, see ownPad """
+    side = template.layer[0]
+    m = Module()
+    m.name = template.name
+    m.layer = template.layer
+    m.at = (e.x, e.y)
+    m.texts = [kicadText(e.name, e.textx, e.texty, e.tdir, e.tscale, side + '.SilkS', 'reference'),
+        kicadText(e.value, 0, 0, e.tdir, e.tscale, side + '.Fab', 'value'), template.texts[2]]
+    m.pads = list(template.pads)
+    m.lines = list(template.lines)
+    m.arcs = list(template.arcs)
+    m.template = template
+    return m
+
+def ownPad(m, j):
+    """ pad j of module which can be changed, pad shared with template is replaced by its copy (copy on write) """
+    p = m.pads[j]
+    template = getattr(m, 'template', None)
+    if template is not None and j < len(template.pads) and template.pads[j] is p:
+        p = m.pads[j] = clone(p)
+    return p
+
+def clone(obj):
+    """ shallow copy of kicad object """
+    c = obj.__class__.__new__(obj.__class__)
+    c.__dict__.update(obj.__dict__)
+    return c
+
+def kicadLayer(kicad, l, vectorized = None, pours = None):
+    """ adds objects of layer to kicad, (zone, holes, clear) of copper polygons are appended to pours """
+    layer = getLayerName(l)
+    cls, objects = (Segment, kicad.segments) if 'copper' in l.flags else (Line, kicad.lines)
+    for x1, y1, x2, y2, width in geometry('lines', l.lines, vectorized):
+        s = cls()
+        s.start = (x1, y1)
+        s.end = (x2, y2)
+        s.width = width
+        s.layer = layer
+        objects.append(s)
+    for text in l.texts:
+        kicad.texts.append(kicadText(text.string, text.x, text.y, text.dir, text.scale, layer))
+    for arc, end in zip(l.arcs, geometry('arcs', l.arcs, vectorized)):
+        kicad.arcs.append(kicadArc(arc, layer, tuple(end)))    #TODO detect circles?
+    for poly in l.polygons:
+        z = Zone()
+        z.layer = layer
+        z.pts = poly.points
+        kicad.zones.append(z)
+        if pours is not None and 'copper' in l.flags:
+            pours.append((z, [h.points for h in poly.holes], 'clearpoly' in poly.flags))
+        for h in poly.holes:
+            z = Zone()
+            z.layer = layer
+            z.pts = h.points
+            z.keepouts = {'copperpour'}
+            kicad.zones.append(z)
+
+SHOWN = 10  #missing pins printed, all are in stats
+
+def pcb2kicad(pcb, stats = NOSTATS, vectorized = None, merge = False, nets = False, shared = True):
+    """ vectorized True or False forces numpy or scalar geometry kernels, see geometry
+    shared modules of elements with same footprint share geometry, see footprintModule
+    merge joins collinear segments, see mergeSegments
+    nets assigns nets of pads to connected segments and vias, see connectivity.assignNets
+    and nets of pins and vias with thermals to polygons, see connectivity.zoneNets """
+    kicad = Kicad()
+    kicad.version = '20171130'
+    kicad.host = ['pcbnew', '5.0.0']
+
+    #TODO thermal parameter in zones
+
+    kicadSettings(kicad, pcb)
+
     for pv in pcb.vias:
-        v = Via()
-        v.at = (pv.x, pv.y)
-        v.size = pv.diameter
-        v.drill = pv.drill
-        v.layers = [ 'F.Cu' , 'B.Cu'] #TODO burried
-        kicad.vias.append(v)
-
-    partsdic = {} #used for connections
-    for e in pcb.elements:
-        m = Module()
-        partsdic[e.name] = m
-        m.name = e.description
-        side = 'B' if 'onsolder' in e.flags else 'F'
-        m.layer = side + '.Cu'
-        m.at = (e.x, e.y)
-        m.texts.append(kicadText(e.name, e.textx, e.texty, e.tdir, e.tscale, side + '.SilkS', 'reference'))
-        m.texts.append(kicadText(e.value, 0, 0, e.tdir, e.tscale, side + '.Fab', 'value'))
-        m.texts.append(kicadText('%R', 0, 0, e.tdir, e.tscale, side + '.Fab', 'user'))
-        for pad in e.pads:
-            p = Pad()
-            x = (pad.x1 + pad.x2) / 2
-            y = (pad.y1 + pad.y2) / 2
-            w = abs(pad.x1 - pad.x2) + pad.thick
-            h = abs(pad.y1 - pad.y2) + pad.thick
-            p.at = (x, y)
-            p.size = (w, h)
-            pside = 'B' if 'onsolder' in pad.flags else 'F'
-            p.layers = [pside  + '.Cu', pside + '.Mask']
-            if not 'nopaste' in pad.flags:
-                p.layers.append(pside + '.Paste')
-            p.name = pad.number
-            p.t = 'smd'
-            p.shape = 'rect' if 'square' in pad.flags else 'oval'
-            m.pads.append(p)
-        for pin in e.pins:
-            p = Pad()
-            p.at = (pin.x, pin.y)
-            p.size = (pin.dimater, pin.dimater)
-            p.drill = pin.drill
-            p.layers = ['*.Cu', '*.Mask']
-            p.name = pin.number
-            p.t = 'np_thru_hole' if 'hole' in pin.flags else 'thru_hole'
-            p.shape = 'rect' if 'square' in pin.flags else 'circle'
-            m.pads.append(p)
-        for line in e.lines:
-            m.lines.append(kicadLine(line, side + '.SilkS'))
-            m.lines.append(kicadLine(line, side + '.Fab'))  #TODO optional?
-        for arc in e.arcs:
-            m.arcs.append(kicadArc(arc, side + '.SilkS'))
-            m.arcs.append(kicadArc(arc, side + '.Fab'))  #TODO optional?
-        
+        kicad.vias.append(kicadVia(pv))
 
+    pads = {} #(refdes, pin number) -> (module, index of pad), used for connections
+    keys = [footprintKey(e) for e in pcb.elements] if shared else list(range(len(pcb.elements)))
+    templates = {}  #key -> first element with it
+    for key, e in zip(keys, pcb.elements):
+        templates.setdefault(key, e)
+    padGeometries = iter(geometry('pads', [pad for e in templates.values() for pad in e.pads], vectorized))
+    elementArcEnds = iter(geometry('arcs', [arc for e in templates.values() for arc in e.arcs], vectorized))
+    for key, e in templates.items():
+        templates[key] = kicadModule(e, padGeometries, elementArcEnds)
+    for key, e in zip(keys, pcb.elements):
+        m = footprintModule(templates[key], e)
+        for i, p in enumerate(m.pads):
+            pads.setdefault((e.name, p.name), []).append((m, i))
         kicad.modules.append(m)
+    stats.count('footprints', len(templates))
 
-    i = 1
-    for n in pcb.netlist.nets:
+    missing = []
+    for i, n in enumerate(pcb.netlist.nets, 1):
         kicad.nets[i] = n.name #TODO net classes if they are used
         for c in n.connects:
-            try:
-                m = partsdic[c.part]
-                for pad in m.pads:
-                    if pad.name == c.pin:
-                        pad.net = (i, n.name)
-            except KeyError:
-                print('part %s not found: netlist connection not exported' % c.part)
-        i += 1
-
+            if (c.part, c.pin) not in pads:
+                missing.append(c.part + '-' + c.pin)
+                continue
+            for m, j in pads[(c.part, c.pin)]:
+                ownPad(m, j).net = (i, n.name)
+    if missing:
+        more = ' and %d more%s' % (len(missing) - SHOWN, ', see stats' if stats.enabled else '') if len(missing) > SHOWN else ''
+        print('%d pins not found, netlist connections not exported: %s%s' % (len(missing), ' '.join(missing[:SHOWN]), more))
+        stats.count('missing_connections', len(missing))
+        stats.extend('missing_connections', missing)
 
+    pours = []
     for l in pcb.layers:
-        layer = getLayerName(l)
-        for line in l.lines:
-            if 'copper' in l.flags:
-                s = Segment()
-                s.start = (line.x1, line.y1)
-                s.end = (line.x2, line.y2)
-                s.width = line.thick
-                s.layer = layer
-                kicad.segments.append(s)
-            else:
-                kicad.lines.append(kicadLine(line, layer))
-        for text in l.texts:
-            kicad.texts.append(kicadText(text.string, text.x, text.y, text.dir, text.scale, layer))
-        for arc in l.arcs:
-            kicad.arcs.append(kicadArc(arc, layer))    #TODO detect circles?
-        for poly in l.polygons:
-            z = Zone()
-            z.layer = layer     #TODO detect net?
-            z.pts = poly.points
-            kicad.zones.append(z)
-            for h in poly.holes:
-                z = Zone()
-                z.layer = layer
-                z.pts = h.points
-                z.keepouts = {'copperpour'}
-                kicad.zones.append(z)
+        kicadLayer(kicad, l, vectorized, pours)
+    if merge:
+        fixed = [(shape, layers) for o, shape, layers in connectivity.copper(kicad) if not isinstance(o, Segment)]
+        count = len(kicad.segments)
+        kicad.segments = mergeSegments(kicad.segments, fixed)
+        print('%d segments merged into %d' % (count, len(kicad.segments)))
+        stats.count('merged_segments', count - len(kicad.segments))
+    if nets:
+        print('nets assigned to %d segments and vias' % connectivity.assignNets(kicad, stats))
+        print('nets assigned to %d zones' % connectivity.zoneNets(pours, zonePoints(pcb, kicad), stats))
+    if stats.enabled:
+        stats.count('modules', len(kicad.modules))
+        stats.count('pads', sum(len(m.pads) for m in kicad.modules))
+        stats.count('segments', len(kicad.segments))
+        stats.count('vias', len(kicad.vias))
+        stats.count('zones', len(kicad.zones))
     return kicad
 
+def convert(infile, outfile, stats = NOSTATS, merge = False, nets = False):
+    values = parsepcb.ValueCache()
+    with stats.phase('parse'):
+        items = parsepcb.load(infile, values)
+    with stats.phase('model'):
+        pcb = Pcb(items)
+    with stats.phase('convert'):
+        kicad = pcb2kicad(pcb, stats, merge = merge, nets = nets)
+    with stats.phase('save'):
+        kicad.save(outfile)
+    if stats.enabled:
+        stats.count('items', countItems(items))
+        stats.count('elements', len(pcb.elements))
+        stats.count('value_cache_hits', values.hits)
+        stats.count('value_cache_misses', values.misses)
+        stats.count('value_cache_uncached', values.uncached)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print('usage:\n%s infile.pcb [outfile.kicad_pcb]' % sys.argv[0])
-        exit(1)
-    infile = sys.argv[1]
-    if len(sys.argv) == 2:
+    parser = argparse.ArgumentParser(description = 'Converts gEDA PCB file to kicad_pcb.')
+    parser.add_argument('infile')
+    parser.add_argument('outfile', nargs = '?', help = 'default is infile with .kicad_pcb extension')
+    parser.add_argument('--merge-segments', action = 'store_true', help = 'join collinear touching segments of same width')
+    parser.add_argument('--nets', action = 'store_true', help = 'assign nets of pads to connected segments and vias')
+    parser.add_argument('--incremental', action = 'store_true', help = 'rewrite only objects changed since previous incremental conversion in existing outfile, keeping manual edits of others')
+    cache.addArguments(parser)
+    stats.addArguments(parser)
+    args = parser.parse_args()
+    infile = args.infile
+    if args.outfile is None:
         if infile.endswith('.pcb'):
             outfile = infile[:-3] + 'kicad_pcb'
         else:
             print('infile does not end with .pcb, can not guess outfile')
             exit(1)
     else:
-        outfile = sys.argv[2]
+        outfile = args.outfile
 
-    pcb = Pcb(infile)
-    kicad = pcb2kicad(pcb)
-    kicad.save(outfile)
-    print('kicad written to %s' % outfile)
+    if args.incremental and args.merge_segments:
+        parser.error('--merge-segments can not be used with --incremental')
+
+    c = None if args.incremental else cache.fromArguments(args) #incremental output depends on previous output, so it is not cached
+    st = stats.fromArguments(args)
+    if args.incremental:
+        import incremental
+        incremental.convert(infile, outfile, st, args.nets)
+        print('kicad written to %s' % outfile)
+    else:
+        options = {'merge': args.merge_segments, 'nets': args.nets}
+        key = cache.conversionKey(c, infile, sys.modules[__name__], **options)
+        if cache.convert(c, key, outfile, lambda: convert(infile, outfile, st, **options)):
+            print('kicad copied from cache to %s' % outfile)
+            st.count('cache_hits')
+        else:
+            print('kicad written to %s' % outfile)
+    if c:
+        print('cache hits %(hits)d, misses %(misses)d' % c.stats())
+    if st.enabled:
+        st.write(args.stats_file)
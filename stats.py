@@ -0,0 +1,76 @@
+#Timing of conversion phases and counts of produced objects
+
+import json, sys, time
+from contextlib import contextmanager, nullcontext
+
+class Stats:
+    """ collects wall and cpu time of phases, counts of objects and lists of reported objects, e.g. missing pins """
+    enabled = True
+    def __init__(self):
+        self.phases = {}
+        self.counts = {}
+        self.lists = {}
+
+    @contextmanager
+    def phase(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            p = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            p['wall'] += time.perf_counter() - wall
+            p['cpu'] += time.process_time() - cpu
+
+    def count(self, name, n = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def extend(self, name, values):
+        self.lists.setdefault(name, []).extend(values)
+
+    def toJson(self):
+        r = {'phases': self.phases, 'counts': self.counts}
+        if self.lists:
+            r['lists'] = self.lists
+        return json.dumps(r, indent = 1)
+
+    def write(self, path = None):
+        """ path None is stderr """
+        if path is None:
+            print(self.toJson(), file = sys.stderr)
+        else:
+            with open(path, 'w') as f:
+                f.write(self.toJson())
+
+class NoStats:
+    """ used when statistics are disabled, hooks do nothing
+    counts which need extra work should be guarded by enabled """
+    enabled = False
+    def phase(self, name):
+        return NOPHASE
+    def count(self, name, n = 1):
+        pass
+    def extend(self, name, values):
+        pass
+
+NOPHASE = nullcontext()
+NOSTATS = NoStats()
+
+def countItems(items):
+    """ number of parsepcb items including nested ones """
+    n = 0
+    stack = [items]
+    while stack:
+        items = stack.pop()
+        n += len(items)
+        for i in items:
+            if i.children:
+                stack.append(i.children)
+    return n
+
+def addArguments(parser):
+    parser.add_argument('--stats', action = 'store_true', help = 'write time of phases and object counts as json to stderr')
+    parser.add_argument('--stats-file', metavar = 'FILE', help = 'write time of phases and object counts as json to FILE')
+
+def fromArguments(args):
+    return Stats() if args.stats or args.stats_file else NOSTATS